@@ -1,12 +1,26 @@
 """Invoice CLI - Fetch and organize invoice emails from Gmail using AI classification."""
 
+import heapq
+import os
 import re
+import threading
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    as_completed,
+    wait,
+)
+from dataclasses import dataclass
 from datetime import datetime
+from functools import lru_cache
+from itertools import islice
 from pathlib import Path
+from types import MappingProxyType
 
 import typer
 from rich.console import Console
-from rich.table import Table
 
 from invoice_cli.config import (
     AccountConfig,
@@ -14,26 +28,16 @@ from invoice_cli.config import (
     Config,
     OwnershipConfig,
     StorageConfig,
+    config_transaction,
     get_config_path,
     get_tokens_dir,
     load_config,
     save_config,
 )
-from invoice_cli.classifier import detect_invoice, extract_details, extract_from_pdf, is_invoice
-from invoice_cli.pdf import extract_text_from_pdf, is_pdf
-from invoice_cli.gmail import (
-    download_attachment,
-    get_attachments,
-    get_body_text,
-    get_credentials_path,
-    get_email_metadata,
-    get_message,
-    get_service,
-    get_user_email,
-    search_messages,
-)
-from invoice_cli.storage import InvoiceRecord, InvoiceStorage
-from invoice_cli.gdrive import get_drive_service, create_folder_path, upload_file
+from invoice_cli.storage import InvoiceRecord, InvoiceStorage, scan_attachments
+
+# Heavy modules (Google API client, BAML classifier, pdfplumber, rich.table) are
+# imported inside the commands that need them to keep CLI startup fast.
 
 app = typer.Typer(
     name="invoice-cli",
@@ -41,6 +45,57 @@ app = typer.Typer(
 )
 console = Console()
 
+# Number of updated records to accumulate before writing them in process()
+SAVE_BATCH_SIZE = 50
+
+# process() pipeline: concurrent AI extraction calls, and max records in flight
+AI_WORKERS = 4
+PIPELINE_WINDOW = 8
+
+# Path sanitization and date parsing patterns
+_SANITIZE_BAD_CHARS = re.compile(r'[<>:"/\\|?*]')
+_SANITIZE_UNDERSCORES = re.compile(r"_+")
+_EMAIL_DATE_RE = re.compile(r"(\d{1,2})\s+(\w+)\s+(\d{4})")
+_DATE_FORMATS = (
+    "%Y-%m-%d",
+    "%Y/%m/%d",
+    "%d %b %Y",
+    "%d %B %Y",
+    "%b %d, %Y",
+    "%B %d, %Y",
+)
+_MONTHS = MappingProxyType({
+    "Jan": 1, "Feb": 2, "Mar": 3, "Apr": 4, "May": 5, "Jun": 6,
+    "Jul": 7, "Aug": 8, "Sep": 9, "Oct": 10, "Nov": 11, "Dec": 12,
+})
+
+
+class BufferedConsole:
+    """Collects output lines and writes them to a console in one print.
+
+    Can be used as a context manager, flushing on exit (including on errors).
+    """
+
+    def __init__(self, target: Console) -> None:
+        self.target = target
+        self._line_buffer: list[str] = []
+
+    def write(self, line: str = "") -> None:
+        """Append a line to the buffer."""
+        self._line_buffer.append(line)
+
+    def flush(self) -> None:
+        """Print all buffered lines with a single console call."""
+        if self._line_buffer:
+            self.target.print("\n".join(self._line_buffer))
+            self._line_buffer.clear()
+
+    def __enter__(self) -> "BufferedConsole":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.flush()
+
 
 @app.command()
 def setup(
@@ -103,86 +158,84 @@ def set_company(
     country: str | None = typer.Option(None, "--country", help="Country"),
 ) -> None:
     """Configure your company/personal info for business invoice tagging."""
-    config = load_config()
-
-    # Check if any options were provided
-    any_provided = any([
-        owner_name, company_name, vat_id, tax_id,
-        street, city, postal_code, country
-    ])
-
-    if not any_provided:
-        # Interactive mode
-        console.print("[blue]Configure your company info[/blue]")
-        console.print("[dim]Press Enter to keep current value, or type new value[/dim]\n")
-
-        config.company.owner_name = _prompt_with_default(
-            "Your name", config.company.owner_name
-        )
-        config.company.company_name = _prompt_with_default(
-            "Company name", config.company.company_name
-        )
-        config.company.vat_id = _prompt_with_default(
-            "VAT ID", config.company.vat_id
-        )
-        config.company.tax_id = _prompt_with_default(
-            "Tax ID (optional)", config.company.tax_id
-        )
-
-        console.print("\n[dim]Address (for matching invoices):[/dim]")
-        config.company.street = _prompt_with_default(
-            "Street", config.company.street
-        )
-        config.company.city = _prompt_with_default(
-            "City", config.company.city
-        )
-        config.company.postal_code = _prompt_with_default(
-            "Postal code", config.company.postal_code
-        )
-        config.company.country = _prompt_with_default(
-            "Country", config.company.country
-        )
-    else:
-        # Update only provided fields
-        if owner_name is not None:
-            config.company.owner_name = owner_name
-        if company_name is not None:
-            config.company.company_name = company_name
-        if vat_id is not None:
-            config.company.vat_id = vat_id
-        if tax_id is not None:
-            config.company.tax_id = tax_id
-        if street is not None:
-            config.company.street = street
-        if city is not None:
-            config.company.city = city
-        if postal_code is not None:
-            config.company.postal_code = postal_code
-        if country is not None:
-            config.company.country = country
-
-    save_config(config)
+    with config_transaction() as config:
+        # Check if any options were provided
+        any_provided = any((
+            owner_name, company_name, vat_id, tax_id,
+            street, city, postal_code, country
+        ))
+
+        if not any_provided:
+            # Interactive mode
+            console.print("[blue]Configure your company info[/blue]")
+            console.print("[dim]Press Enter to keep current value, or type new value[/dim]\n")
+
+            config.company.owner_name = _prompt_with_default(
+                "Your name", config.company.owner_name
+            )
+            config.company.company_name = _prompt_with_default(
+                "Company name", config.company.company_name
+            )
+            config.company.vat_id = _prompt_with_default(
+                "VAT ID", config.company.vat_id
+            )
+            config.company.tax_id = _prompt_with_default(
+                "Tax ID (optional)", config.company.tax_id
+            )
 
-    console.print("\n[green]Company info saved![/green]")
-    console.print()
-    if config.company.owner_name:
-        console.print(f"  Owner: {config.company.owner_name}")
-    if config.company.company_name:
-        console.print(f"  Company: {config.company.company_name}")
-    if config.company.vat_id:
-        console.print(f"  VAT ID: {config.company.vat_id}")
-    if config.company.tax_id:
-        console.print(f"  Tax ID: {config.company.tax_id}")
-    if config.company.street or config.company.city:
+            console.print("\n[dim]Address (for matching invoices):[/dim]")
+            config.company.street = _prompt_with_default(
+                "Street", config.company.street
+            )
+            config.company.city = _prompt_with_default(
+                "City", config.company.city
+            )
+            config.company.postal_code = _prompt_with_default(
+                "Postal code", config.company.postal_code
+            )
+            config.company.country = _prompt_with_default(
+                "Country", config.company.country
+            )
+        else:
+            # Update only provided fields
+            if owner_name is not None:
+                config.company.owner_name = owner_name
+            if company_name is not None:
+                config.company.company_name = company_name
+            if vat_id is not None:
+                config.company.vat_id = vat_id
+            if tax_id is not None:
+                config.company.tax_id = tax_id
+            if street is not None:
+                config.company.street = street
+            if city is not None:
+                config.company.city = city
+            if postal_code is not None:
+                config.company.postal_code = postal_code
+            if country is not None:
+                config.company.country = country
+
+    company = config.company
+    lines = ["\n[green]Company info saved![/green]", ""]
+    if company.owner_name:
+        lines.append(f"  Owner: {company.owner_name}")
+    if company.company_name:
+        lines.append(f"  Company: {company.company_name}")
+    if company.vat_id:
+        lines.append(f"  VAT ID: {company.vat_id}")
+    if company.tax_id:
+        lines.append(f"  Tax ID: {company.tax_id}")
+    if company.street or company.city:
         addr_parts = [
             p for p in [
-                config.company.street,
-                config.company.postal_code,
-                config.company.city,
-                config.company.country,
+                company.street,
+                company.postal_code,
+                company.city,
+                company.country,
             ] if p
         ]
-        console.print(f"  Address: {', '.join(addr_parts)}")
+        lines.append(f"  Address: {', '.join(addr_parts)}")
+    console.print("\n".join(lines), soft_wrap=True)
 
 
 @app.command()
@@ -199,22 +252,26 @@ def add_seller(
         console.print("[red]Error:[/red] Cannot be both personal and work")
         raise typer.Exit(1)
 
-    config = load_config()
-
-    category = "personal" if personal else "work"
-    target_list = config.ownership.personal_companies if personal else config.ownership.work_companies
+    with config_transaction() as config:
+        category = "personal" if personal else "work"
+        ownership = config.ownership
+        target_list = ownership.personal_companies if personal else ownership.work_companies
+        target_lower = ownership.personal_lower if personal else ownership.work_lower
+        company_lower = company.lower()
 
-    # Check if already exists
-    if company.lower() in [c.lower() for c in target_list]:
-        console.print(f"[yellow]'{company}' already in {category} list[/yellow]")
-        return
+        # Check if already exists
+        if company_lower in target_lower:
+            console.print(f"[yellow]'{company}' already in {category} list[/yellow]")
+            return
 
-    # Remove from other list if present
-    other_list = config.ownership.work_companies if personal else config.ownership.personal_companies
-    other_list[:] = [c for c in other_list if c.lower() != company.lower()]
+        # Remove from other list if present
+        other_list = ownership.work_companies if personal else ownership.personal_companies
+        other_lower = ownership.work_lower if personal else ownership.personal_lower
+        if company_lower in other_lower:
+            other_list[:] = [c for c in other_list if c.lower() != company_lower]
 
-    target_list.append(company)
-    save_config(config)
+        target_list.append(company)
+        ownership.invalidate_lookups()
 
     console.print(f"[green]Added '{company}' to {category} sellers[/green]")
 
@@ -224,21 +281,28 @@ def remove_seller(
     company: str = typer.Argument(..., help="Company/seller name to remove"),
 ) -> None:
     """Remove a seller company from ownership categories."""
-    config = load_config()
-
-    found = False
-    for lst, name in [(config.ownership.personal_companies, "personal"), (config.ownership.work_companies, "work")]:
-        for c in lst[:]:
-            if c.lower() == company.lower():
-                lst.remove(c)
-                found = True
-                console.print(f"[green]Removed '{c}' from {name} sellers[/green]")
-
-    if not found:
-        console.print(f"[yellow]'{company}' not found in any list[/yellow]")
-        return
+    with config_transaction() as config:
+        ownership = config.ownership
+        company_lower = company.lower()
+
+        found = False
+        for lst, lookup, name in [
+            (ownership.personal_companies, ownership.personal_lower, "personal"),
+            (ownership.work_companies, ownership.work_lower, "work"),
+        ]:
+            if company_lower not in lookup:
+                continue
+            for c in lst[:]:
+                if c.lower() == company_lower:
+                    lst.remove(c)
+                    found = True
+                    console.print(f"[green]Removed '{c}' from {name} sellers[/green]")
+
+        if not found:
+            console.print(f"[yellow]'{company}' not found in any list[/yellow]")
+            return
 
-    save_config(config)
+        ownership.invalidate_lookups()
 
 
 @app.command()
@@ -249,29 +313,25 @@ def set_drive_account(
 
     All invoices from all accounts will be uploaded to this account's Drive.
     """
-    config = load_config()
+    with config_transaction() as config:
+        # Verify account exists
+        drive_account = config.accounts_by_name.get(account_name)
+        if not drive_account:
+            console.print(f"[red]Account '{account_name}' not found.[/red]")
+            console.print(f"Available accounts: {', '.join(config.accounts_by_name) or 'none'}")
+            raise typer.Exit(1)
 
-    # Verify account exists
-    account_names = [a.name for a in config.accounts]
-    if account_name not in account_names:
-        console.print(f"[red]Account '{account_name}' not found.[/red]")
-        console.print(f"Available accounts: {', '.join(account_names) or 'none'}")
-        raise typer.Exit(1)
-
-    config.drive.account = account_name
-    save_config(config)
+        config.drive.account = account_name
 
     console.print(f"[green]Drive account set to:[/green] {account_name}")
     console.print("[dim]All uploads will go to this account's Google Drive.[/dim]")
 
     # Check if re-authentication might be needed
-    drive_account = next((a for a in config.accounts if a.name == account_name), None)
-    if drive_account:
-        token_path = Path(drive_account.token_file)
-        if token_path.exists():
-            console.print("\n[yellow]Note:[/yellow] You may need to re-authenticate to grant Drive access.")
-            console.print("[dim]If upload fails, delete the token file and run 'invoice-cli upload':[/dim]")
-            console.print(f"  rm {token_path}")
+    token_path = Path(drive_account.token_file)
+    if token_path.exists():
+        console.print("\n[yellow]Note:[/yellow] You may need to re-authenticate to grant Drive access.")
+        console.print("[dim]If upload fails, delete the token file and run 'invoice-cli upload':[/dim]")
+        console.print(f"  rm {token_path}")
 
 
 @app.command()
@@ -339,6 +399,8 @@ def add_account(
     force: bool = typer.Option(False, "--force", "-f", help="Re-authenticate existing account"),
 ) -> None:
     """Add a Gmail account via OAuth2 authentication."""
+    from invoice_cli.gmail import get_credentials_path, get_service, get_user_email
+
     # Check for credentials.json
     credentials_path = get_credentials_path()
     if not credentials_path.exists():
@@ -358,11 +420,7 @@ def add_account(
     config = load_config()
 
     # Check if account already exists
-    existing_account = None
-    for acc in config.accounts:
-        if acc.name == name:
-            existing_account = acc
-            break
+    existing_account = config.accounts_by_name.get(name)
 
     if existing_account:
         if not force:
@@ -447,6 +505,18 @@ def fetch(
     ),
 ) -> None:
     """Fetch emails with attachments and classify invoices."""
+    from invoice_cli.classifier import detect_invoice, extract_details, is_invoice
+    from invoice_cli.gmail import (
+        download_attachments_bulk,
+        get_attachments,
+        get_body_text,
+        get_credentials,
+        get_email_metadata,
+        get_messages,
+        get_service,
+        search_messages,
+    )
+
     config = load_config()
 
     if not config.accounts:
@@ -457,10 +527,11 @@ def fetch(
     # Filter accounts if specified
     accounts = config.accounts
     if account:
-        accounts = [a for a in accounts if a.name == account]
-        if not accounts:
+        selected = config.accounts_by_name.get(account)
+        if not selected:
             console.print(f"[red]Account '{account}' not found[/red]")
             raise typer.Exit(1)
+        accounts = [selected]
 
     # Initialize storage
     storage = InvoiceStorage(config.storage.base_path)
@@ -483,6 +554,7 @@ def fetch(
 
         try:
             service = get_service(Path(acc.token_file))
+            credentials = get_credentials(Path(acc.token_file))
         except Exception as e:
             console.print(f"[red]Failed to connect:[/red] {e}")
             continue
@@ -492,13 +564,18 @@ def fetch(
         message_ids = search_messages(service, query, max_results=max_emails)
         console.print(f"[dim]Found {len(message_ids)} messages[/dim]")
 
-        for msg_id in message_ids:
-            # Skip if already processed
-            if skip_classified and storage.has_message(msg_id):
+        # Skip if already processed
+        if skip_classified:
+            message_ids = [m for m in message_ids if not storage.has_message(m)]
+
+        # Get full messages in batched requests
+        messages = get_messages(service, message_ids)
+
+        for msg_id, message in zip(message_ids, messages):
+            if isinstance(message, Exception):
+                console.print(f"[red]Failed to fetch {msg_id}:[/red] {message}")
                 continue
 
-            # Get full message
-            message = get_message(service, msg_id)
             metadata = get_email_metadata(message)
             body = get_body_text(message)
 
@@ -533,14 +610,24 @@ def fetch(
             attachment_files: list[str] = []
             if is_inv:
                 attachments = get_attachments(message)
-                for att in attachments:
-                    try:
-                        data = download_attachment(service, msg_id, att.attachment_id)
-                        path = storage.save_attachment(msg_id, att.filename, data)
-                        attachment_files.append(str(path))
-                        console.print(f"  [green]Saved:[/green] {att.filename}")
-                    except Exception as e:
-                        console.print(f"  [red]Failed to save {att.filename}:[/red] {e}")
+                paths = [storage.attachment_path(msg_id, att.filename) for att in attachments]
+
+                # Download concurrently, decoding straight to disk
+                results = download_attachments_bulk(
+                    service,
+                    credentials,
+                    [
+                        (msg_id, att.attachment_id, path, att.size)
+                        for att, path in zip(attachments, paths)
+                    ],
+                )
+                for att, path in zip(attachments, paths):
+                    result = results[path]
+                    if isinstance(result, Exception):
+                        console.print(f"  [red]Failed to save {att.filename}:[/red] {result}")
+                        continue
+                    attachment_files.append(str(path))
+                    console.print(f"  [green]Saved:[/green] {att.filename}")
 
             # Create and save record
             record = InvoiceRecord(
@@ -623,6 +710,9 @@ def list_invoices(
     ),
 ) -> None:
     """List fetched invoices."""
+    from rich.console import Group
+    from rich.table import Table
+
     config = load_config()
     storage = InvoiceStorage(config.storage.base_path)
 
@@ -654,15 +744,15 @@ def list_invoices(
         console.print("[yellow]No invoices found.[/yellow]")
         return
 
-    # Sort by date
-    def get_sort_date(r: InvoiceRecord) -> datetime:
-        date_obj = _parse_date(r.invoice_date or r.date)
-        return date_obj or datetime.min
+    # Parse each date once, then select the top `limit` records by date
+    dated = [(_parse_date(r.invoice_date or r.date), r) for r in records]
 
-    records.sort(key=get_sort_date, reverse=(sort.lower() == "desc"))
+    def get_sort_date(item: tuple[datetime | None, InvoiceRecord]) -> datetime:
+        return item[0] or datetime.min
 
-    # Limit results
-    records = records[:limit]
+    select = heapq.nlargest if sort.lower() == "desc" else heapq.nsmallest
+    dated = select(limit, dated, key=get_sort_date)
+    records = [r for _, r in dated]
 
     # Create table
     table = Table(title=f"Invoices ({len(records)} shown)")
@@ -679,9 +769,8 @@ def list_invoices(
     # Track totals by currency
     totals: dict[str, float] = {}
 
-    for record in records:
-        # Parse and format date consistently
-        date_obj = _parse_date(record.invoice_date or record.date)
+    for date_obj, record in dated:
+        # Format date consistently
         date_str = date_obj.strftime("%Y-%m-%d") if date_obj else ""
 
         # Format amount and track totals
@@ -723,13 +812,15 @@ def list_invoices(
             gmail_str,
         )
 
-    console.print(table)
-
-    # Print totals
+    # Render table and totals in a single write
+    renderables: list = [table]
     if totals:
-        console.print()
-        for currency, total in sorted(totals.items()):
-            console.print(f"[bold yellow]Total ({currency}):[/bold yellow] {total:,.2f}")
+        renderables.append("")
+        renderables.extend(
+            f"[bold yellow]Total ({currency}):[/bold yellow] {total:,.2f}"
+            for currency, total in sorted(totals.items())
+        )
+    console.print(Group(*renderables))
 
 
 @app.command()
@@ -759,163 +850,173 @@ def get(
             return
 
     # Display record details
-    console.print(f"\n[bold blue]Invoice Details[/bold blue]\n")
+    out = BufferedConsole(console)
+    out.write(f"\n[bold blue]Invoice Details[/bold blue]\n")
 
     # Basic info
-    console.print(f"[cyan]Message ID:[/cyan] {record.message_id}")
+    out.write(f"[cyan]Message ID:[/cyan] {record.message_id}")
     gmail_url = f"https://mail.google.com/mail/u/0/#inbox/{record.message_id}"
-    console.print(f"[cyan]Gmail Link:[/cyan] [link={gmail_url}]{gmail_url}[/link]")
-    console.print(f"[cyan]Subject:[/cyan] {record.subject}")
-    console.print(f"[cyan]Sender:[/cyan] {record.sender}")
+    out.write(f"[cyan]Gmail Link:[/cyan] [link={gmail_url}]{gmail_url}[/link]")
+    out.write(f"[cyan]Subject:[/cyan] {record.subject}")
+    out.write(f"[cyan]Sender:[/cyan] {record.sender}")
 
     # Parse and display date
     date_obj = _parse_date(record.date)
     date_str = date_obj.strftime("%Y-%m-%d %H:%M") if date_obj else record.date
-    console.print(f"[cyan]Email Date:[/cyan] {date_str}")
-    console.print(f"[cyan]Account:[/cyan] {record.account_name} ({record.account_email})")
+    out.write(f"[cyan]Email Date:[/cyan] {date_str}")
+    out.write(f"[cyan]Account:[/cyan] {record.account_name} ({record.account_email})")
 
     # Classification
-    console.print(f"\n[bold]Classification[/bold]")
-    console.print(f"  Status: {record.classification_status}")
-    console.print(f"  Confidence: {record.classification_confidence:.0%}")
-    console.print(f"  Reasoning: {record.classification_reasoning}")
+    out.write(f"\n[bold]Classification[/bold]")
+    out.write(f"  Status: {record.classification_status}")
+    out.write(f"  Confidence: {record.classification_confidence:.0%}")
+    out.write(f"  Reasoning: {record.classification_reasoning}")
 
     # Invoice details
     if record.is_invoice:
-        console.print(f"\n[bold]Invoice Details[/bold]")
+        out.write(f"\n[bold]Invoice Details[/bold]")
         if record.company_name:
-            console.print(f"  Company: {record.company_name}")
+            out.write(f"  Company: {record.company_name}")
         if record.invoice_number:
-            console.print(f"  Invoice #: {record.invoice_number}")
+            out.write(f"  Invoice #: {record.invoice_number}")
         if record.invoice_date:
-            console.print(f"  Invoice Date: {record.invoice_date}")
+            out.write(f"  Invoice Date: {record.invoice_date}")
         if record.due_date:
-            console.print(f"  Due Date: {record.due_date}")
+            out.write(f"  Due Date: {record.due_date}")
         if record.amount is not None:
             currency = record.currency or ""
-            console.print(f"  Amount: {record.amount:,.2f} {currency}")
+            out.write(f"  Amount: {record.amount:,.2f} {currency}")
         if record.subtotal is not None:
-            console.print(f"  Subtotal: {record.subtotal:,.2f}")
+            out.write(f"  Subtotal: {record.subtotal:,.2f}")
         if record.tax_amount is not None:
-            console.print(f"  Tax: {record.tax_amount:,.2f}")
+            out.write(f"  Tax: {record.tax_amount:,.2f}")
         if record.description:
-            console.print(f"  Description: {record.description}")
+            out.write(f"  Description: {record.description}")
 
         # Seller info
         if record.seller_vat_id or record.seller_address:
-            console.print(f"\n[bold]Seller[/bold]")
+            out.write(f"\n[bold]Seller[/bold]")
             if record.seller_vat_id:
-                console.print(f"  VAT ID: {record.seller_vat_id}")
+                out.write(f"  VAT ID: {record.seller_vat_id}")
             if record.seller_address:
                 addr = record.seller_address
                 addr_parts = [addr.get(k) for k in ["street", "postal_code", "city", "country"] if addr.get(k)]
                 if addr_parts:
-                    console.print(f"  Address: {', '.join(addr_parts)}")
+                    out.write(f"  Address: {', '.join(addr_parts)}")
 
         # Buyer info
         if record.buyer_name or record.buyer_vat_id or record.buyer_address:
-            console.print(f"\n[bold]Buyer[/bold]")
+            out.write(f"\n[bold]Buyer[/bold]")
             if record.buyer_name:
-                console.print(f"  Name: {record.buyer_name}")
+                out.write(f"  Name: {record.buyer_name}")
             if record.buyer_vat_id:
-                console.print(f"  VAT ID: {record.buyer_vat_id}")
+                out.write(f"  VAT ID: {record.buyer_vat_id}")
             if record.buyer_address:
                 addr = record.buyer_address
                 addr_parts = [addr.get(k) for k in ["street", "postal_code", "city", "country"] if addr.get(k)]
                 if addr_parts:
-                    console.print(f"  Address: {', '.join(addr_parts)}")
+                    out.write(f"  Address: {', '.join(addr_parts)}")
 
         # Business flag
         if record.is_business:
-            console.print(f"\n[cyan]✓ Business Invoice[/cyan]")
+            out.write(f"\n[cyan]✓ Business Invoice[/cyan]")
 
         # Line items
         if record.line_items:
-            console.print(f"\n[bold]Line Items[/bold]")
+            out.write(f"\n[bold]Line Items[/bold]")
             for item in record.line_items:
                 desc = item.get("description", "Unknown")[:50]
                 qty = item.get("quantity", 1)
                 unit = item.get("unit_price")
                 total = item.get("total")
                 if total is not None:
-                    console.print(f"  • {desc} (x{qty}) - {total:,.2f}")
+                    out.write(f"  • {desc} (x{qty}) - {total:,.2f}")
                 else:
-                    console.print(f"  • {desc} (x{qty})")
+                    out.write(f"  • {desc} (x{qty})")
 
         # Bank details
         if record.bank_details:
-            console.print(f"\n[bold]Bank Details[/bold]")
+            out.write(f"\n[bold]Bank Details[/bold]")
             bank = record.bank_details
             if bank.get("bank_name"):
-                console.print(f"  Bank: {bank['bank_name']}")
+                out.write(f"  Bank: {bank['bank_name']}")
             if bank.get("iban"):
-                console.print(f"  IBAN: {bank['iban']}")
+                out.write(f"  IBAN: {bank['iban']}")
             if bank.get("swift"):
-                console.print(f"  SWIFT: {bank['swift']}")
+                out.write(f"  SWIFT: {bank['swift']}")
 
     # Attachments
     if record.attachments:
-        console.print(f"\n[bold]Attachments[/bold]")
+        out.write(f"\n[bold]Attachments[/bold]")
+        entries = scan_attachments(record.attachments)
         for att in record.attachments:
-            att_path = Path(att)
-            if att_path.exists():
-                size = att_path.stat().st_size
-                size_str = f"{size / 1024:.1f} KB" if size < 1024 * 1024 else f"{size / 1024 / 1024:.1f} MB"
-                console.print(f"  • {att_path.name} ({size_str})")
-                console.print(f"    [dim]{att}[/dim]")
-            else:
-                console.print(f"  • {att_path.name} [red](missing)[/red]")
+            name = os.path.basename(att)
+            entry = entries.get(att)
+            if entry is None:
+                out.write(f"  • {name} [red](missing)[/red]")
+                continue
+            size = entry.stat().st_size
+            size_str = f"{size / 1024:.1f} KB" if size < 1024 * 1024 else f"{size / 1024 / 1024:.1f} MB"
+            out.write(f"  • {name} ({size_str})")
+            out.write(f"    [dim]{att}[/dim]")
     else:
-        console.print(f"\n[yellow]No attachments - manual download may be needed[/yellow]")
-        console.print(f"[dim]Use Gmail link above to access the email[/dim]")
+        out.write(f"\n[yellow]No attachments - manual download may be needed[/yellow]")
+        out.write(f"[dim]Use Gmail link above to access the email[/dim]")
 
     # Processing info
-    console.print(f"\n[dim]Processed: {record.processed_at}[/dim]")
+    out.write(f"\n[dim]Processed: {record.processed_at}[/dim]")
     if record.pdf_processed:
-        console.print(f"[dim]PDF Processed: {record.pdf_processed_at}[/dim]")
+        out.write(f"[dim]PDF Processed: {record.pdf_processed_at}[/dim]")
+
+    out.flush()
 
 
+@lru_cache(maxsize=4096)
 def _sanitize_name(name: str) -> str:
     """Sanitize a name for use in file paths."""
-    # Replace problematic characters
-    sanitized = re.sub(r'[<>:"/\\|?*]', "_", name)
-    # Remove leading/trailing whitespace and dots
-    sanitized = sanitized.strip(". ")
-    # Collapse multiple underscores
-    sanitized = re.sub(r"_+", "_", sanitized)
-    return sanitized or "unknown"
+    # Replace problematic characters, collapse underscores, strip whitespace/dots
+    sanitized = _SANITIZE_UNDERSCORES.sub("_", _SANITIZE_BAD_CHARS.sub("_", name))
+    return sanitized.strip(". ") or "unknown"
 
 
 def _parse_date(date_str: str) -> datetime | None:
     """Try to parse a date string."""
     if not date_str:
         return None
+    return _parse_date_cached(date_str)
+
+
+@lru_cache(maxsize=4096)
+def _parse_date_cached(date_str: str) -> datetime | None:
+    """Parse a non-empty date string (memoized, many records share dates)."""
+    # Fast path for plain ISO dates (YYYY-MM-DD), the most common shape
+    year, month, day = date_str[:4], date_str[5:7], date_str[8:]
+    if (
+        len(date_str) == 10
+        and date_str[4] == "-"
+        and date_str[7] == "-"
+        and year.isdigit()
+        and month.isdigit()
+        and day.isdigit()
+    ):
+        try:
+            return datetime(int(year), int(month), int(day))
+        except ValueError:
+            pass
 
     # Try common formats
-    formats = [
-        "%Y-%m-%d",
-        "%Y/%m/%d",
-        "%d %b %Y",
-        "%d %B %Y",
-        "%b %d, %Y",
-        "%B %d, %Y",
-    ]
-
-    for fmt in formats:
+    prefix = date_str[:20]
+    for fmt in _DATE_FORMATS:
         try:
-            return datetime.strptime(date_str[:20], fmt)
+            return datetime.strptime(prefix, fmt)
         except ValueError:
             continue
 
     # Try extracting from email date format (e.g., "Mon, 25 Dec 2024 10:30:00")
-    match = re.search(r"(\d{1,2})\s+(\w+)\s+(\d{4})", date_str)
+    match = _EMAIL_DATE_RE.search(date_str)
     if match:
         day, month_str, year = match.groups()
-        months = {
-            "Jan": 1, "Feb": 2, "Mar": 3, "Apr": 4, "May": 5, "Jun": 6,
-            "Jul": 7, "Aug": 8, "Sep": 9, "Oct": 10, "Nov": 11, "Dec": 12,
-        }
-        month = months.get(month_str[:3])
+        month = _MONTHS.get(month_str[:3])
         if month:
             try:
                 return datetime(int(year), month, int(day))
@@ -944,8 +1045,7 @@ def organize(
     config = load_config()
     storage = InvoiceStorage(config.storage.base_path)
 
-    records = storage.load_index()
-    invoices = [r for r in records if r.is_invoice]
+    invoices = storage.load_index(invoices_only=True)
 
     if not invoices:
         console.print("[yellow]No invoices to organize.[/yellow]")
@@ -959,74 +1059,105 @@ def organize(
         organized_dir.mkdir(exist_ok=True)
 
     created_count = 0
+    unchanged_count = 0
     skipped_count = 0
+    created_dirs: set[Path] = set()
+    pattern_parts = pattern.split("/")
 
+    out = BufferedConsole(console)
     for record in invoices:
-        if not record.attachments:
-            continue
+        with out:
+            if not record.attachments:
+                continue
 
-        # Parse date
-        date = _parse_date(record.invoice_date or record.date)
-        if not date:
-            console.print(f"[yellow]Skipping (no date):[/yellow] {record.subject[:50]}")
-            skipped_count += 1
-            continue
+            # Parse date
+            date = _parse_date(record.invoice_date or record.date)
+            if not date:
+                out.write(f"[yellow]Skipping (no date):[/yellow] {record.subject[:50]}")
+                skipped_count += 1
+                continue
 
-        # Build folder path based on pattern
-        company = _sanitize_name(record.company_name or "Unknown")
-        year = str(date.year)
-        month = date.strftime("%m")  # Zero-padded month
-
-        folder_parts = []
-        for part in pattern.split("/"):
-            if part == "year":
-                folder_parts.append(year)
-            elif part == "month":
-                folder_parts.append(month)
-            elif part == "company":
-                folder_parts.append(company)
-            else:
-                folder_parts.append(part)
+            # Build folder path based on pattern
+            company = _sanitize_name(record.company_name or "Unknown")
+            year = str(date.year)
+            month = date.strftime("%m")  # Zero-padded month
 
-        target_folder = organized_dir.joinpath(*folder_parts)
+            folder_parts = []
+            for part in pattern_parts:
+                if part == "year":
+                    folder_parts.append(year)
+                elif part == "month":
+                    folder_parts.append(month)
+                elif part == "company":
+                    folder_parts.append(company)
+                else:
+                    folder_parts.append(part)
 
-        # Create symlinks for each attachment
-        for att_path in record.attachments:
-            att = Path(att_path)
-            if not att.exists():
-                continue
+            target_folder = organized_dir.joinpath(*folder_parts)
 
-            # Build descriptive filename
+            # Descriptive filename stem shared by all of this record's attachments
             date_prefix = date.strftime("%Y-%m-%d")
             desc = _sanitize_name(record.description or company)[:50]
-            new_name = f"{date_prefix}-{desc}{att.suffix}"
+            name_stem = f"{date_prefix}-{desc}"
 
-            link_path = target_folder / new_name
+            # Create symlinks for each attachment
+            present = scan_attachments(record.attachments)
+            for att in record.attachments:
+                if att not in present:
+                    continue
 
-            if dry_run:
-                console.print(f"  {link_path}")
-            else:
-                target_folder.mkdir(parents=True, exist_ok=True)
+                new_name = f"{name_stem}{os.path.splitext(att)[1]}"
 
-                # Remove existing symlink if present
-                if link_path.exists() or link_path.is_symlink():
-                    link_path.unlink()
+                link_path = target_folder / new_name
 
-                # Create symlink (relative path)
-                try:
-                    rel_path = Path("../" * len(folder_parts)) / att.relative_to(
-                        config.storage.base_path
-                    )
-                    link_path.symlink_to(rel_path)
-                    console.print(f"  [green]Created:[/green] {link_path.name}")
-                    created_count += 1
-                except Exception as e:
-                    console.print(f"  [red]Failed:[/red] {link_path.name} - {e}")
+                if dry_run:
+                    out.write(f"  {link_path}")
+                else:
+                    if target_folder not in created_dirs:
+                        target_folder.mkdir(parents=True, exist_ok=True)
+                        created_dirs.add(target_folder)
+
+                    # Create symlink (relative to the link's own folder)
+                    try:
+                        rel_path = os.path.relpath(att, start=target_folder)
+                        if _ensure_symlink(rel_path, link_path):
+                            out.write(f"  [green]Created:[/green] {link_path.name}")
+                            created_count += 1
+                        else:
+                            unchanged_count += 1
+                    except Exception as e:
+                        out.write(f"  [red]Failed:[/red] {link_path.name} - {e}")
 
     if dry_run:
         console.print(f"\n[dim]Would organize {len(invoices)} invoices[/dim]")
     else:
-        console.print(f"\n[green]Done![/green] Created {created_count} symlinks")
+        console.print(
+            f"\n[green]Done![/green] Created {created_count} symlinks"
+            f" ({unchanged_count} already up to date)"
+        )
+
+
+def _ensure_symlink(target: str, link_path: Path) -> bool:
+    """Point link_path at target, replacing whatever is there.
+
+    Returns:
+        False if link_path already pointed at target, True otherwise
+    """
+    try:
+        os.symlink(target, link_path)
+        return True
+    except FileExistsError:
+        pass
+
+    try:
+        if os.readlink(link_path) == target:
+            return False
+    except OSError:
+        pass  # Not a symlink; replace it
+
+    os.unlink(link_path)
+    os.symlink(target, link_path)
+    return True
 
 
 @app.command()
@@ -1065,12 +1196,26 @@ def upload(
         "--from-account",
         help="Only upload invoices from this Gmail account",
     ),
+    workers: int = typer.Option(
+        8,
+        "--workers",
+        "-j",
+        help="Number of parallel uploads",
+    ),
 ) -> None:
     """Upload invoices to Google Drive.
 
     Uploads invoice attachments to an organized folder structure on Drive.
     Uses the account set with 'set-drive-account' for uploads.
     """
+    from invoice_cli.gdrive import (
+        create_folder_path,
+        find_existing_files,
+        get_drive_service,
+        resolve_root_folder,
+        upload_file,
+    )
+
     config = load_config()
     storage = InvoiceStorage(config.storage.base_path)
 
@@ -1081,10 +1226,7 @@ def upload(
         raise typer.Exit(1)
 
     # Find the drive account config
-    drive_account = next(
-        (a for a in config.accounts if a.name == config.drive.account),
-        None,
-    )
+    drive_account = config.accounts_by_name.get(config.drive.account)
     if not drive_account:
         console.print(f"[red]Drive account '{config.drive.account}' not found in config.[/red]")
         raise typer.Exit(1)
@@ -1095,16 +1237,12 @@ def upload(
     root_folder_id = root_id or config.drive.root_folder_id
 
     # Load invoices
-    records = storage.load_index()
-    invoices = [r for r in records if r.is_invoice]
-
-    # Filter by account if specified
-    if from_account:
-        invoices = [r for r in invoices if r.account_name == from_account]
-
-    # Filter out already uploaded unless force
-    if not force:
-        invoices = [r for r in invoices if not r.gdrive_uploaded]
+    # Filter by account if specified, and skip already uploaded unless force
+    invoices = [
+        r for r in storage.load_index(invoices_only=True)
+        if (not from_account or r.account_name == from_account)
+        and (force or not r.gdrive_uploaded)
+    ]
 
     if not invoices:
         console.print("[yellow]No invoices to upload.[/yellow]")
@@ -1123,38 +1261,45 @@ def upload(
         console.print("[dim]Dry run - no changes will be made[/dim]\n")
 
     # Initialize Drive service (only if not dry run)
+    token_file = Path(drive_account.token_file)
     service = None
+    base_folder_id = None
     if not dry_run:
-        token_file = Path(drive_account.token_file)
         service = get_drive_service(token_file)
+        # Resolve the root once; per-record folders are created beneath it
+        base_folder_id = resolve_root_folder(service, root_folder, root_folder_id)
 
     uploaded_count = 0
     skipped_count = 0
 
+    # Empty pattern = flat structure (all in root)
+    pattern_parts = [p.strip() for p in (folder_pattern or "").split("/") if p.strip()]
+
+    # (record, folder path, target folder ID, [(local path, Drive name)])
+    plans: list[tuple[InvoiceRecord, str, str | None, list[tuple[Path, str]]]] = []
+
+    out = BufferedConsole(console)
     for record in invoices:
-        if not record.attachments:
-            console.print(f"[yellow]Skipping (no attachments):[/yellow] {record.subject[:50]}")
-            skipped_count += 1
-            continue
+        with out:
+            if not record.attachments:
+                out.write(f"[yellow]Skipping (no attachments):[/yellow] {record.subject[:50]}")
+                skipped_count += 1
+                continue
 
-        # Parse date
-        date = _parse_date(record.invoice_date or record.date)
-        if not date:
-            console.print(f"[yellow]Skipping (no date):[/yellow] {record.subject[:50]}")
-            skipped_count += 1
-            continue
+            # Parse date
+            date = _parse_date(record.invoice_date or record.date)
+            if not date:
+                out.write(f"[yellow]Skipping (no date):[/yellow] {record.subject[:50]}")
+                skipped_count += 1
+                continue
 
-        # Build folder path based on pattern
-        company = _sanitize_name(record.company_name or "Unknown")
-        year = str(date.year)
-        month = date.strftime("%m")
+            # Build folder path based on pattern
+            company = _sanitize_name(record.company_name or "Unknown")
+            year = str(date.year)
+            month = date.strftime("%m")
 
-        folder_parts = []
-        if folder_pattern:  # Empty pattern = flat structure (all in root)
-            for part in folder_pattern.split("/"):
-                part = part.strip()
-                if not part:
-                    continue
+            folder_parts = []
+            for part in pattern_parts:
                 if part == "year":
                     folder_parts.append(year)
                 elif part == "month":
@@ -1164,45 +1309,144 @@ def upload(
                 else:
                     folder_parts.append(part)
 
-        folder_path = "/".join([root_folder] + folder_parts) if folder_parts else root_folder
+            folder_path = "/".join([root_folder] + folder_parts) if folder_parts else root_folder
 
-        # Upload each attachment
-        file_ids = []
-        for att_path_str in record.attachments:
-            att_path = Path(att_path_str)
-            if not att_path.exists():
-                console.print(f"  [yellow]Skipping (file missing):[/yellow] {att_path.name}")
-                continue
-
-            # Build filename: {date}-{company}-{description}.pdf
+            # Build filename stem: {date}-{company}-{description}
             date_prefix = date.strftime("%Y-%m-%d")
             desc = _sanitize_name(record.description or record.company_name or "invoice")[:50]
-            new_name = f"{date_prefix}-{company}-{desc}{att_path.suffix}"
+            name_stem = f"{date_prefix}-{company}-{desc}"
+
+            # Plan each attachment upload
+            planned_files: list[tuple[Path, str]] = []
+            present = scan_attachments(record.attachments)
+            for att_path_str in record.attachments:
+                if att_path_str not in present:
+                    out.write(
+                        f"  [yellow]Skipping (file missing):[/yellow] {os.path.basename(att_path_str)}"
+                    )
+                    continue
 
-            if dry_run:
-                console.print(f"  [dim]Would upload:[/dim] {folder_path}/{new_name}")
-            else:
-                # Create folder structure and upload
+                new_name = f"{name_stem}{os.path.splitext(att_path_str)[1]}"
+
+                if dry_run:
+                    out.write(f"  [dim]Would upload:[/dim] {folder_path}/{new_name}")
+                else:
+                    planned_files.append((Path(att_path_str), new_name))
+
+            if planned_files:
+                # Create folder structure once per record
                 target_folder_id = create_folder_path(
-                    service, folder_parts, root_folder, root_folder_id
+                    service, folder_parts, root_folder_id=base_folder_id
                 )
-                file_id = upload_file(service, att_path, target_folder_id, new_name, skip_existing=True)
+                plans.append((record, folder_path, target_folder_id, planned_files))
+
+    # Upload in parallel; each worker thread gets its own Drive service since
+    # the underlying HTTP client is not thread-safe
+    thread_state = threading.local()
+
+    def upload_one(att_path: Path, folder_id: str | None, new_name: str) -> str | None:
+        worker_service = getattr(thread_state, "service", None)
+        if worker_service is None:
+            worker_service = thread_state.service = get_drive_service(token_file)
+        return upload_file(
+            worker_service,
+            att_path,
+            folder_id,
+            new_name,
+            skip_existing=True,
+            existing_files=existing_files,
+        )
 
-                if file_id:
-                    file_ids.append(file_id)
-                    console.print(f"  [green]Uploaded:[/green] {folder_path}/{new_name}")
-                    uploaded_count += 1
-                else:
-                    console.print(f"  [yellow]Skipped (exists):[/yellow] {new_name}")
-                    skipped_count += 1
-
-        # Update record if uploaded
-        if not dry_run and file_ids:
-            record.gdrive_uploaded = True
-            record.gdrive_uploaded_at = datetime.now().isoformat()
-            record.gdrive_file_ids = file_ids
-            record.gdrive_folder_path = folder_path
-            storage.save_record(record)
+    # Uploaded file IDs and outstanding upload count per plan
+    results: list[list[str | None]] = [[None] * len(files) for _, _, _, files in plans]
+    remaining = [len(files) for _, _, _, files in plans]
+    dirty: list[InvoiceRecord] = []
+
+    def finish_file(plan_idx: int) -> None:
+        """Count a file as done; once a plan's files are all done, queue its record."""
+        remaining[plan_idx] -= 1
+        if remaining[plan_idx]:
+            return
+
+        record, folder_path, _, _ = plans[plan_idx]
+        file_ids = [file_id for file_id in results[plan_idx] if file_id]
+        if not file_ids:
+            return
+        record.gdrive_uploaded = True
+        record.gdrive_uploaded_at = datetime.now().isoformat()
+        record.gdrive_file_ids = file_ids
+        record.gdrive_folder_path = folder_path
+
+        # Records are saved in batches as their uploads complete
+        dirty.append(record)
+        if len(dirty) >= SAVE_BATCH_SIZE:
+            storage.save_records(dirty)
+            dirty.clear()
+
+    try:
+        # Check all planned files for existing copies in batched requests
+        existing_files = {}
+        if plans:
+            existing_files = find_existing_files(
+                service,
+                [(folder_id, name) for _, _, folder_id, files in plans for _, name in files],
+            )
+
+        def report(future: Future, plan_idx: int, file_idx: int) -> None:
+            """Print the outcome of one finished upload and record its file ID."""
+            nonlocal uploaded_count, skipped_count
+            _, folder_path, _, files = plans[plan_idx]
+            new_name = files[file_idx][1]
+            try:
+                file_id = future.result()
+            except Exception as e:
+                console.print(f"  [red]Failed:[/red] {folder_path}/{new_name} - {e}")
+                finish_file(plan_idx)
+                return
+
+            if file_id:
+                results[plan_idx][file_idx] = file_id
+                console.print(f"  [green]Uploaded:[/green] {folder_path}/{new_name}")
+                uploaded_count += 1
+            else:
+                console.print(f"  [yellow]Skipped (exists):[/yellow] {new_name}")
+                skipped_count += 1
+            finish_file(plan_idx)
+
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            # Submit each Drive target once; two uploads racing on the same
+            # name would both see it missing and create duplicates
+            futures: dict[Future, tuple[int, int]] = {}
+            submitted: set[tuple[str | None, str]] = set()
+            pending: set[Future] = set()
+            try:
+                for plan_idx, (_, _, folder_id, files) in enumerate(plans):
+                    for file_idx, (att_path, new_name) in enumerate(files):
+                        if (folder_id, new_name) in submitted:
+                            console.print(f"  [yellow]Skipped (exists):[/yellow] {new_name}")
+                            skipped_count += 1
+                            finish_file(plan_idx)
+                            continue
+                        submitted.add((folder_id, new_name))
+                        future = executor.submit(upload_one, att_path, folder_id, new_name)
+                        futures[future] = (plan_idx, file_idx)
+                        pending.add(future)
+
+                # Report completions from the main thread as they arrive
+                for future in as_completed(futures):
+                    pending.discard(future)
+                    report(future, *futures[future])
+            except BaseException:
+                # Don't start queued uploads after an interrupt; record the
+                # ones already in flight so their files aren't orphaned on Drive
+                executor.shutdown(cancel_futures=True)
+                for future in pending:
+                    if not future.cancelled():
+                        report(future, *futures[future])
+                raise
+    finally:
+        # Persist whatever was uploaded, even if the run is interrupted
+        storage.save_records(dirty)
 
     if dry_run:
         console.print(f"\n[dim]Would upload from {len(invoices)} invoices[/dim]")
@@ -1210,56 +1454,163 @@ def upload(
         console.print(f"\n[green]Done![/green] Uploaded {uploaded_count}, skipped {skipped_count}")
 
 
+# Characters dropped from VAT/tax IDs before comparison
+_ID_STRIP_TABLE = str.maketrans("", "", " -")
+
+
 def _normalize_id(value: str | None) -> str | None:
     """Normalize an ID for comparison (remove spaces, uppercase)."""
     if not value:
         return None
-    return value.replace(" ", "").replace("-", "").upper()
+    return value.translate(_ID_STRIP_TABLE).upper()
+
+
+@dataclass(frozen=True)
+class _CompanyKeys:
+    """Configured company identifiers, normalized once for matching."""
+
+    vat_id: str | None
+    tax_id: str | None
+    owner_name: str | None
+    company_name: str | None
+
+    @classmethod
+    def from_config(cls, config: Config) -> "_CompanyKeys":
+        company = config.company
+        return cls(
+            vat_id=_normalize_id(company.vat_id),
+            tax_id=_normalize_id(company.tax_id),
+            owner_name=company.owner_name.lower() if company.owner_name else None,
+            company_name=company.company_name.lower() if company.company_name else None,
+        )
 
 
-def _check_business_match(config, details) -> bool:
+def _check_business_match(keys: _CompanyKeys, details) -> bool:
     """Check if the invoice buyer matches the configured company."""
-    # Check VAT ID
-    if config.company.vat_id and details.buyer_vat_id:
-        if _normalize_id(config.company.vat_id) == _normalize_id(details.buyer_vat_id):
+    # Check VAT ID / Tax ID
+    if details.buyer_vat_id and (keys.vat_id is not None or keys.tax_id is not None):
+        buyer_id = _normalize_id(details.buyer_vat_id)
+        if keys.vat_id is not None and keys.vat_id == buyer_id:
             return True
-
-    # Check Tax ID
-    if config.company.tax_id and details.buyer_vat_id:
-        if _normalize_id(config.company.tax_id) == _normalize_id(details.buyer_vat_id):
+        if keys.tax_id is not None and keys.tax_id == buyer_id:
             return True
 
     # Check buyer name against owner name or company name
     if details.buyer_name:
         buyer_lower = details.buyer_name.lower()
-        if config.company.owner_name and config.company.owner_name.lower() in buyer_lower:
+        if keys.owner_name and keys.owner_name in buyer_lower:
             return True
-        if config.company.company_name and config.company.company_name.lower() in buyer_lower:
+        if keys.company_name and keys.company_name in buyer_lower:
             return True
 
     return False
 
 
-def _determine_ownership(config: Config, company_name: str | None) -> str | None:
-    """Determine ownership based on seller company name matching configured companies."""
+def _build_automaton(companies: frozenset[str]):
+    """Build an Aho-Corasick automaton over lowercased company names.
+
+    Returns None when pyahocorasick is not installed or there are no names,
+    in which case matching falls back to a substring scan.
+    """
+    if not companies:
+        return None
+
+    # Optional multi-pattern matcher for large seller lists
+    try:
+        import ahocorasick
+    except ImportError:
+        return None
+
+    automaton = ahocorasick.Automaton()
+    for company in companies:
+        if company:
+            automaton.add_word(company, company)
+    automaton.make_automaton()
+    return automaton
+
+
+def _matches_company(company_lower: str, companies: frozenset[str], automaton=None) -> bool:
+    """Check if a seller name contains, or is contained in, any configured name."""
+    if automaton is not None:
+        if next(automaton.iter(company_lower), None) is not None:
+            return True
+    elif any(c in company_lower for c in companies):
+        return True
+
+    # Reverse direction: a short seller name inside a configured name
+    return any(company_lower in c for c in companies)
+
+
+def _determine_ownership(
+    config: Config,
+    company_name: str | None,
+    automata: tuple | None = None,
+) -> str | None:
+    """Determine ownership based on seller company name matching configured companies.
+
+    Args:
+        config: Loaded configuration
+        company_name: Seller company name
+        automata: Optional (personal, work) automata from _build_automaton
+    """
     if not company_name:
         return None
 
     company_lower = company_name.lower()
+    personal = config.ownership.personal_lower
+    work = config.ownership.work_lower
+    personal_automaton, work_automaton = automata or (None, None)
 
-    # Check personal companies
-    for pc in config.ownership.personal_companies:
-        if pc.lower() in company_lower or company_lower in pc.lower():
-            return "personal"
+    # Check personal companies, exact match first (O(1))
+    if company_lower in personal or _matches_company(company_lower, personal, personal_automaton):
+        return "personal"
 
     # Check work companies
-    for wc in config.ownership.work_companies:
-        if wc.lower() in company_lower or company_lower in wc.lower():
-            return "work"
+    if company_lower in work or _matches_company(company_lower, work, work_automaton):
+        return "work"
 
     return None
 
 
+def _apply_pdf_details(record: InvoiceRecord, details) -> None:
+    """Copy fields extracted from a PDF onto a record.
+
+    Enhanced fields are always overwritten; basic fields are only filled in
+    when the record doesn't have them yet.
+    """
+    record.seller_vat_id = details.seller_vat_id
+    record.buyer_name = details.buyer_name
+    record.buyer_vat_id = details.buyer_vat_id
+
+    if details.seller_address:
+        record.seller_address = details.seller_address.model_dump()
+    if details.buyer_address:
+        record.buyer_address = details.buyer_address.model_dump()
+    if details.bank_details:
+        record.bank_details = details.bank_details.model_dump()
+    if details.line_items:
+        record.line_items = [item.model_dump() for item in details.line_items]
+
+    record.tax_amount = details.tax_amount
+    record.subtotal = details.subtotal
+
+    # Update basic fields if they were empty
+    if not record.company_name and details.company_name:
+        record.company_name = details.company_name
+    if not record.amount and details.amount:
+        record.amount = details.amount
+    if not record.currency and details.currency:
+        record.currency = details.currency
+    if not record.invoice_number and details.invoice_number:
+        record.invoice_number = details.invoice_number
+    if not record.invoice_date and details.invoice_date:
+        record.invoice_date = details.invoice_date
+    if not record.due_date and details.due_date:
+        record.due_date = details.due_date
+    if not record.description and details.description:
+        record.description = details.description
+
+
 @app.command()
 def process(
     reprocess: bool = typer.Option(
@@ -1282,21 +1633,19 @@ def process(
     ),
 ) -> None:
     """Process PDF attachments to extract enhanced invoice details."""
+    from invoice_cli.classifier import extract_from_pdf
+    from invoice_cli.pdf import extract_text_from_pdf, is_pdf
+
     config = load_config()
     storage = InvoiceStorage(config.storage.base_path)
 
     # Load records to process
-    records = storage.load_index()
-    invoices = [r for r in records if r.is_invoice]
-
-    if message_id:
-        invoices = [r for r in invoices if r.message_id == message_id]
-
-    if not reprocess:
-        invoices = [r for r in invoices if not r.pdf_processed]
-
-    if limit > 0:
-        invoices = invoices[:limit]
+    selected = (
+        r for r in storage.load_index(invoices_only=True)
+        if (not message_id or r.message_id == message_id)
+        and (reprocess or not r.pdf_processed)
+    )
+    invoices = list(islice(selected, limit) if limit > 0 else selected)
 
     if not invoices:
         console.print("[yellow]No invoices to process.[/yellow]")
@@ -1309,96 +1658,136 @@ def process(
     processed = 0
     errors = 0
 
-    for record in invoices:
-        console.print(f"[dim]Processing:[/dim] {record.subject[:60]}...")
+    # Normalize configured identifiers once for all records
+    company_keys = _CompanyKeys.from_config(config)
+    ownership_automata = (
+        _build_automaton(config.ownership.personal_lower),
+        _build_automaton(config.ownership.work_lower),
+    )
 
-        # Find PDF attachments
+    # Pick the first PDF attachment of each record
+    jobs: list[tuple[InvoiceRecord, Path]] = []
+    for record in invoices:
         attachments = storage.get_attachments_for_message(record.message_id)
-        pdf_files = [a for a in attachments if is_pdf(a)]
-
-        if not pdf_files:
+        pdf_path = next((a for a in attachments if is_pdf(a)), None)
+        if pdf_path is None:
+            console.print(f"[dim]Processing:[/dim] {record.subject[:60]}...")
             console.print("  [yellow]No PDF attachments found[/yellow]")
             continue
+        jobs.append((record, pdf_path))
 
-        # Process first PDF
-        pdf_path = pdf_files[0]
+    # No more than PIPELINE_WINDOW extractions are ever queued, so extra
+    # worker processes would only add startup cost
+    pdf_workers = max(1, min(os.cpu_count() or 1, len(jobs), PIPELINE_WINDOW))
 
-        try:
-            # Extract text
-            pdf_text = extract_text_from_pdf(pdf_path)
+    # Pipeline: PDF text extraction (CPU-bound) runs in a process pool while
+    # AI extraction (network-bound) runs in a thread pool. At most
+    # PIPELINE_WINDOW records are in flight to bound memory use.
+    pending_jobs = iter(jobs)
+    in_flight: dict[Future, tuple[str, InvoiceRecord]] = {}
+    dirty: list[InvoiceRecord] = []
 
-            if not pdf_text.strip():
-                console.print("  [yellow]PDF has no extractable text[/yellow]")
-                continue
+    try:
+        with (
+            ProcessPoolExecutor(max_workers=pdf_workers) as pdf_pool,
+            ThreadPoolExecutor(max_workers=AI_WORKERS) as ai_pool,
+        ):
+            while True:
+                # Top up the window with new PDF extractions
+                while len(in_flight) < PIPELINE_WINDOW:
+                    job = next(pending_jobs, None)
+                    if job is None:
+                        break
+                    record, pdf_path = job
+                    future = pdf_pool.submit(extract_text_from_pdf, pdf_path)
+                    in_flight[future] = ("pdf", record)
+
+                if not in_flight:
+                    break
+
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    stage, record = in_flight.pop(future)
+                    header = f"[dim]Processing:[/dim] {record.subject[:60]}..."
 
-            # Get email context
-            email_context = f"Subject: {record.subject}\nFrom: {record.sender}"
-
-            # Call AI extraction
-            details = extract_from_pdf(pdf_text, email_context)
-
-            # Update record with enhanced data
-            record.seller_vat_id = details.seller_vat_id
-            record.buyer_name = details.buyer_name
-            record.buyer_vat_id = details.buyer_vat_id
-
-            if details.seller_address:
-                record.seller_address = details.seller_address.model_dump()
-            if details.buyer_address:
-                record.buyer_address = details.buyer_address.model_dump()
-            if details.bank_details:
-                record.bank_details = details.bank_details.model_dump()
-            if details.line_items:
-                record.line_items = [item.model_dump() for item in details.line_items]
-
-            record.tax_amount = details.tax_amount
-            record.subtotal = details.subtotal
-
-            # Update basic fields if they were empty
-            if not record.company_name and details.company_name:
-                record.company_name = details.company_name
-            if not record.amount and details.amount:
-                record.amount = details.amount
-            if not record.currency and details.currency:
-                record.currency = details.currency
-            if not record.invoice_number and details.invoice_number:
-                record.invoice_number = details.invoice_number
-            if not record.invoice_date and details.invoice_date:
-                record.invoice_date = details.invoice_date
-            if not record.due_date and details.due_date:
-                record.due_date = details.due_date
-            if not record.description and details.description:
-                record.description = details.description
-
-            # Check for business invoice
-            record.is_business = _check_business_match(config, details)
-
-            # Auto-assign ownership based on seller company
-            if not record.ownership:
-                record.ownership = _determine_ownership(config, record.company_name)
-
-            # Mark as processed
-            record.pdf_processed = True
-            record.pdf_processed_at = datetime.now().isoformat()
-
-            # Save updated record
-            storage.save_record(record)
+                    try:
+                        result = future.result()
+
+                        if stage == "pdf":
+                            if not result.strip():
+                                console.print(f"{header}\n  [yellow]PDF has no extractable text[/yellow]")
+                                continue
+
+                            # Hand the text to the AI extractor with email context
+                            email_context = f"Subject: {record.subject}\nFrom: {record.sender}"
+                            ai_future = ai_pool.submit(extract_from_pdf, result, email_context)
+                            in_flight[ai_future] = ("ai", record)
+                            continue
+
+                        # Update record with enhanced data
+                        _apply_pdf_details(record, result)
+
+                        # Check for business invoice
+                        record.is_business = _check_business_match(company_keys, result)
+
+                        # Auto-assign ownership based on seller company
+                        if not record.ownership:
+                            record.ownership = _determine_ownership(
+                                config, record.company_name, ownership_automata
+                            )
+
+                        # Mark as processed
+                        record.pdf_processed = True
+                        record.pdf_processed_at = datetime.now().isoformat()
+
+                        # Queue updated record; records are saved in batches
+                        dirty.append(record)
+                        if len(dirty) >= SAVE_BATCH_SIZE:
+                            storage.save_records(dirty)
+                            dirty.clear()
+                    except Exception as e:
+                        errors += 1
+                        console.print(f"{header}\n  [red]Error:[/red] {e}")
+                        continue
+
+                    processed += 1
+                    biz = " [cyan](business)[/cyan]" if record.is_business else ""
+                    own = f" [magenta]({record.ownership})[/magenta]" if record.ownership else ""
+                    vat = f" [dim]VAT: {record.seller_vat_id}[/dim]" if record.seller_vat_id else ""
+                    console.print(f"{header}\n  [green]OK[/green]{biz}{own}{vat}")
+    finally:
+        # Save pending records even if processing is interrupted
+        storage.save_records(dirty)
 
-            processed += 1
-            status = "[green]OK[/green]"
-            if record.is_business:
-                status += " [cyan](business)[/cyan]"
-            if record.ownership:
-                status += f" [magenta]({record.ownership})[/magenta]"
-            if record.seller_vat_id:
-                status += f" [dim]VAT: {record.seller_vat_id}[/dim]"
-            console.print(f"  {status}")
+    console.print(f"\n[green]Done![/green] Processed {processed}, errors: {errors}")
 
-        except Exception as e:
-            errors += 1
-            console.print(f"  [red]Error:[/red] {e}")
 
-    console.print(f"\n[green]Done![/green] Processed {processed}, errors: {errors}")
+@app.command()
+def rebalance_attachments() -> None:
+    """Move attachments from the old flat layout into sharded folders."""
+    config = load_config()
+    storage = InvoiceStorage(config.storage.base_path)
+
+    moved, updated = storage.rebalance()
+    if not moved and not updated:
+        console.print("[dim]Attachments are already sharded.[/dim]")
+        return
+
+    console.print(f"[green]Moved {moved} message folders, updated {updated} records.[/green]")
+    console.print("[dim]Run 'invoice-cli organize' to refresh symlinks.[/dim]")
+
+
+@app.command()
+def rebuild_index() -> None:
+    """Rebuild the local record index from the per-email record files."""
+    config = load_config()
+    storage = InvoiceStorage(config.storage.base_path)
+
+    indexed, skipped = storage.rebuild_index()
+    for path in skipped:
+        console.print(f"  [yellow]Skipped unreadable record:[/yellow] {path.name}")
+
+    console.print(f"[green]Indexed {indexed} records.[/green]")
 
 
 @app.command()
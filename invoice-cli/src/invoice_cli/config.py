@@ -1,10 +1,15 @@
 """Configuration management for invoice-cli."""
 
+import os
+import tempfile
 import tomllib
+from collections.abc import Iterator
+from contextlib import contextmanager
+from functools import lru_cache
 from pathlib import Path
 
 import tomli_w
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, PrivateAttr
 
 
 class AccountConfig(BaseModel):
@@ -51,6 +56,29 @@ class OwnershipConfig(BaseModel):
     personal_companies: list[str] = Field(default_factory=list)
     work_companies: list[str] = Field(default_factory=list)
 
+    # Lowercased lookup sets, built on first access
+    _personal_lower: frozenset[str] | None = PrivateAttr(default=None)
+    _work_lower: frozenset[str] | None = PrivateAttr(default=None)
+
+    @property
+    def personal_lower(self) -> frozenset[str]:
+        """Lowercased personal companies for case-insensitive lookups."""
+        if self._personal_lower is None:
+            self._personal_lower = frozenset(c.lower() for c in self.personal_companies)
+        return self._personal_lower
+
+    @property
+    def work_lower(self) -> frozenset[str]:
+        """Lowercased work companies for case-insensitive lookups."""
+        if self._work_lower is None:
+            self._work_lower = frozenset(c.lower() for c in self.work_companies)
+        return self._work_lower
+
+    def invalidate_lookups(self) -> None:
+        """Drop cached lookup sets after the company lists are modified."""
+        self._personal_lower = None
+        self._work_lower = None
+
 
 class DriveConfig(BaseModel):
     """Configuration for Google Drive uploads."""
@@ -71,6 +99,11 @@ class Config(BaseModel):
     ownership: OwnershipConfig = Field(default_factory=OwnershipConfig)
     drive: DriveConfig = Field(default_factory=DriveConfig)
 
+    @property
+    def accounts_by_name(self) -> dict[str, AccountConfig]:
+        """Accounts keyed by name."""
+        return {a.name: a for a in self.accounts}
+
 
 def get_config_dir() -> Path:
     """Get the configuration directory path (XDG-compliant)."""
@@ -89,8 +122,14 @@ def get_tokens_dir() -> Path:
     return get_config_dir() / "tokens"
 
 
+@lru_cache(maxsize=1)
 def load_config() -> Config:
-    """Load configuration from file, or return defaults if not found."""
+    """Load configuration from file, or return defaults if not found.
+
+    The result is cached for the rest of the process; callers share (and may
+    modify) the same Config instance. Use invalidate_config_cache() to force
+    a re-read.
+    """
     config_path = get_config_path()
     if not config_path.exists():
         return Config()
@@ -105,6 +144,11 @@ def load_config() -> Config:
     return Config.model_validate(data)
 
 
+def invalidate_config_cache() -> None:
+    """Drop the cached config so the next load_config() re-reads the file."""
+    load_config.cache_clear()
+
+
 def save_config(config: Config) -> None:
     """Save configuration to file."""
     config_dir = get_config_dir()
@@ -117,9 +161,40 @@ def save_config(config: Config) -> None:
     if "storage" in data and "base_path" in data["storage"]:
         data["storage"]["base_path"] = str(data["storage"]["base_path"])
 
+    # Write to a temp file and rename so readers never see a partial config
     config_path = get_config_path()
-    with open(config_path, "wb") as f:
-        tomli_w.dump(data, f)
+    fd, tmp_path = tempfile.mkstemp(dir=config_dir, prefix=".config-", suffix=".toml")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            tomli_w.dump(data, f)
+        os.replace(tmp_path, config_path)
+    except BaseException:
+        Path(tmp_path).unlink(missing_ok=True)
+        raise
+    finally:
+        invalidate_config_cache()
+
+
+@contextmanager
+def config_transaction() -> Iterator[Config]:
+    """Load the config for modification and save it once on exit.
+
+    The config is only written back if the block completes without raising
+    and something actually changed.
+
+    Yields:
+        Loaded Config to modify in place
+    """
+    config = load_config()
+    before = config.model_dump()
+    try:
+        yield config
+    except BaseException:
+        # Don't let a half-applied edit linger in the cached config
+        invalidate_config_cache()
+        raise
+    if config.model_dump() != before:
+        save_config(config)
 
 
 def ensure_config_exists() -> Config:
@@ -7,6 +7,15 @@ from googleapiclient.http import MediaFileUpload
 
 from invoice_cli.gmail import authenticate
 
+# Folder IDs resolved during this process, keyed by (parent_id, name)
+_FOLDER_CACHE: dict[tuple[str | None, str], str] = {}
+
+# Maximum number of calls in a single Drive batch request
+BATCH_SIZE = 100
+
+# Files at or above this size are uploaded with a resumable session
+RESUMABLE_THRESHOLD = 5 * 1024 * 1024
+
 
 def get_drive_service(token_file: Path):
     """Build Google Drive API service.
@@ -21,6 +30,11 @@ def get_drive_service(token_file: Path):
     return build("drive", "v3", credentials=creds)
 
 
+def _q_escape(value: str) -> str:
+    """Escape a value for use inside a quoted Drive query string."""
+    return value.replace("\\", "\\\\").replace("'", "\\'")
+
+
 def find_or_create_folder(service, name: str, parent_id: str | None = None) -> str:
     """Find or create a folder in Drive.
 
@@ -32,21 +46,30 @@ def find_or_create_folder(service, name: str, parent_id: str | None = None) -> s
     Returns:
         Folder ID
     """
+    cached_id = _FOLDER_CACHE.get((parent_id, name))
+    if cached_id:
+        return cached_id
+
     # Search for existing folder
-    query = f"name = '{name}' and mimeType = 'application/vnd.google-apps.folder' and trashed = false"
+    query = (
+        f"name = '{_q_escape(name)}' and mimeType = 'application/vnd.google-apps.folder'"
+        " and trashed = false"
+    )
     if parent_id:
-        query += f" and '{parent_id}' in parents"
+        query += f" and '{_q_escape(parent_id)}' in parents"
     else:
         query += " and 'root' in parents"
 
     results = service.files().list(
         q=query,
         spaces="drive",
-        fields="files(id, name)",
+        fields="files(id)",
+        pageSize=1,
     ).execute()
 
     files = results.get("files", [])
     if files:
+        _FOLDER_CACHE[(parent_id, name)] = files[0]["id"]
         return files[0]["id"]
 
     # Create new folder
@@ -62,9 +85,37 @@ def find_or_create_folder(service, name: str, parent_id: str | None = None) -> s
         fields="id",
     ).execute()
 
+    _FOLDER_CACHE[(parent_id, name)] = folder["id"]
     return folder["id"]
 
 
+def resolve_root_folder(
+    service,
+    root_folder: str | None = None,
+    root_folder_id: str | None = None,
+) -> str | None:
+    """Resolve the root folder ID, creating the root path if needed.
+
+    Args:
+        service: Drive API service
+        root_folder: Root folder path (can be nested, e.g., "Business/Invoices")
+        root_folder_id: Direct folder ID (overrides root_folder if provided)
+
+    Returns:
+        Root folder ID, or None for the Drive root
+    """
+    if root_folder_id:
+        return root_folder_id
+
+    current_id = None
+    if root_folder:
+        for root_part in root_folder.split("/"):
+            root_part = root_part.strip()
+            if root_part:
+                current_id = find_or_create_folder(service, root_part, current_id)
+    return current_id
+
+
 def create_folder_path(
     service,
     path_parts: list[str],
@@ -83,15 +134,7 @@ def create_folder_path(
         Final folder ID
     """
     # Start with root folder ID if provided, otherwise create from path
-    if root_folder_id:
-        current_id = root_folder_id
-    else:
-        current_id = None
-        if root_folder:
-            for root_part in root_folder.split("/"):
-                root_part = root_part.strip()
-                if root_part:
-                    current_id = find_or_create_folder(service, root_part, current_id)
+    current_id = resolve_root_folder(service, root_folder, root_folder_id)
 
     # Create each nested folder from pattern
     for part in path_parts:
@@ -111,16 +154,58 @@ def file_exists(service, name: str, folder_id: str) -> str | None:
     Returns:
         File ID if exists, None otherwise
     """
-    query = f"name = '{name}' and '{folder_id}' in parents and trashed = false"
+    results = _file_list_request(service, name, folder_id).execute()
 
-    results = service.files().list(
+    files = results.get("files", [])
+    return files[0]["id"] if files else None
+
+
+def _file_list_request(service, name: str, folder_id: str):
+    """Build the files().list request used to look up a file by name."""
+    query = (
+        f"name = '{_q_escape(name)}' and '{_q_escape(folder_id)}' in parents"
+        " and trashed = false"
+    )
+    return service.files().list(
         q=query,
         spaces="drive",
         fields="files(id)",
-    ).execute()
+        pageSize=1,
+    )
 
-    files = results.get("files", [])
-    return files[0]["id"] if files else None
+
+def find_existing_files(
+    service,
+    files: list[tuple[str, str]],
+) -> dict[tuple[str, str], str | None]:
+    """Check which files exist using batched Drive requests.
+
+    Args:
+        service: Drive API service
+        files: List of (folder_id, name) pairs to check
+
+    Returns:
+        Dict mapping (folder_id, name) to file ID, or None if not found.
+        Pairs whose lookup failed are left out.
+    """
+    existing: dict[tuple[str, str], str | None] = {}
+    unique = list(dict.fromkeys(files))
+
+    for start in range(0, len(unique), BATCH_SIZE):
+        chunk = unique[start:start + BATCH_SIZE]
+
+        def callback(request_id: str, response: dict, exception: Exception | None) -> None:
+            if exception is not None:
+                return
+            found = response.get("files", [])
+            existing[chunk[int(request_id)]] = found[0]["id"] if found else None
+
+        batch = service.new_batch_http_request(callback=callback)
+        for i, (folder_id, name) in enumerate(chunk):
+            batch.add(_file_list_request(service, name, folder_id), request_id=str(i))
+        batch.execute()
+
+    return existing
 
 
 def upload_file(
@@ -129,6 +214,7 @@ def upload_file(
     folder_id: str,
     name: str,
     skip_existing: bool = True,
+    existing_files: dict[tuple[str, str], str | None] | None = None,
 ) -> str | None:
     """Upload a file to Google Drive.
 
@@ -138,14 +224,21 @@ def upload_file(
         folder_id: Target folder ID
         name: File name on Drive
         skip_existing: If True, skip files that already exist
+        existing_files: Prefetched results from find_existing_files; updated
+            with the new file ID after upload
 
     Returns:
         File ID if uploaded, None if skipped
     """
     # Check if file exists
-    existing_id = file_exists(service, name, folder_id)
-    if existing_id and skip_existing:
-        return None  # Skip existing
+    if skip_existing:
+        key = (folder_id, name)
+        if existing_files is not None and key in existing_files:
+            existing_id = existing_files[key]
+        else:
+            existing_id = file_exists(service, name, folder_id)
+        if existing_id:
+            return None  # Skip existing
 
     # Determine mime type
     suffix = local_path.suffix.lower()
@@ -162,7 +255,10 @@ def upload_file(
         "parents": [folder_id],
     }
 
-    media = MediaFileUpload(str(local_path), mimetype=mime_type, resumable=True)
+    # Small files go up in a single multipart request; resumable sessions
+    # cost an extra round trip and only pay off for large uploads
+    resumable = local_path.stat().st_size >= RESUMABLE_THRESHOLD
+    media = MediaFileUpload(str(local_path), mimetype=mime_type, resumable=resumable)
 
     file = service.files().create(
         body=file_metadata,
@@ -170,4 +266,6 @@ def upload_file(
         fields="id",
     ).execute()
 
+    if existing_files is not None:
+        existing_files[(folder_id, name)] = file["id"]
     return file["id"]
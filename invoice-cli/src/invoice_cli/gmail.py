@@ -1,16 +1,66 @@
 """Gmail API integration for invoice-cli."""
 
 import base64
+import os
+import tempfile
+import threading
+from collections import deque
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from dataclasses import dataclass
 from pathlib import Path
+from typing import BinaryIO
 
 from google.auth.transport.requests import Request
+from google_auth_httplib2 import AuthorizedHttp
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
 from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
+from googleapiclient.http import build_http
 
 from invoice_cli.config import get_config_dir
 
+# File locking (POSIX only) serializes token refreshes across processes
+try:
+    import fcntl
+    HAS_FCNTL = True
+except ImportError:
+    HAS_FCNTL = False
+
+# Optional SIMD base64 decoder for large attachments
+try:
+    import pybase64
+    HAS_PYBASE64 = True
+except ImportError:
+    HAS_PYBASE64 = False
+
+_urlsafe_b64decode = pybase64.urlsafe_b64decode if HAS_PYBASE64 else base64.urlsafe_b64decode
+
+# Base64 characters decoded per write when streaming attachments (multiple of 4)
+DECODE_CHUNK_SIZE = 64 * 1024
+
+# Calls per Gmail batch request; Gmail throttles larger batches with 429s
+MESSAGE_BATCH_SIZE = 50
+
+# Retries (with backoff) on 429/5xx when refetching messages a batch dropped
+MESSAGE_RETRIES = 3
+
+# Parallel attachment downloads, and retries (with backoff) on 429/5xx
+DOWNLOAD_WORKERS = 8
+DOWNLOAD_RETRIES = 3
+
+# Headers requested when fetching messages in metadata format
+METADATA_HEADERS = ["From", "Subject", "Date"]
+
+# Lowercased header names read by get_email_metadata
+_METADATA_HEADER_KEYS = frozenset(("subject", "from", "date"))
+
+# Gmail services built during this process and the credentials behind them,
+# keyed by resolved token path
+_SERVICE_CACHE: dict[Path, tuple[object, Credentials]] = {}
+
 # Gmail and Drive API scopes
 SCOPES = [
     "https://www.googleapis.com/auth/gmail.readonly",
@@ -62,31 +112,65 @@ def authenticate(token_file: Path) -> Credentials:
     if token_file.exists():
         creds = Credentials.from_authorized_user_file(str(token_file), SCOPES)
 
+    if creds and creds.valid:
+        return creds
+
     # Refresh or run auth flow if needed
-    if not creds or not creds.valid:
-        if creds and creds.expired and creds.refresh_token:
-            creds.refresh(Request())
-        else:
-            credentials_path = get_credentials_path()
-            if not credentials_path.exists():
-                raise FileNotFoundError(
-                    f"credentials.json not found at {credentials_path}\n"
-                    "Please download it from Google Cloud Console and save it there."
-                )
-
-            flow = InstalledAppFlow.from_client_secrets_file(
-                str(credentials_path), SCOPES
-            )
-            creds = flow.run_local_server(port=0)
+    if creds and creds.expired and creds.refresh_token:
+        with _token_lock(token_file):
+            # Another process may have refreshed the token while we waited
+            creds = Credentials.from_authorized_user_file(str(token_file), SCOPES)
+            if not creds.valid:
+                creds.refresh(Request())
+                _save_token(token_file, creds)
+        return creds
+
+    credentials_path = get_credentials_path()
+    if not credentials_path.exists():
+        raise FileNotFoundError(
+            f"credentials.json not found at {credentials_path}\n"
+            "Please download it from Google Cloud Console and save it there."
+        )
 
-        # Save the token for next time
-        token_file.parent.mkdir(parents=True, exist_ok=True)
-        with open(token_file, "w") as f:
-            f.write(creds.to_json())
+    flow = InstalledAppFlow.from_client_secrets_file(
+        str(credentials_path), SCOPES
+    )
+    creds = flow.run_local_server(port=0)
 
+    # Save the token for next time
+    _save_token(token_file, creds)
     return creds
 
 
+@contextmanager
+def _token_lock(token_file: Path) -> Iterator[None]:
+    """Hold an exclusive lock on the token directory while refreshing."""
+    if not HAS_FCNTL:
+        yield
+        return
+
+    token_file.parent.mkdir(parents=True, exist_ok=True)
+    with open(token_file.parent / ".lock", "w") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _save_token(token_file: Path, creds: Credentials) -> None:
+    """Write a token file atomically so concurrent readers never see it partial."""
+    token_file.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=token_file.parent, prefix=".token-", suffix=".json")
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(creds.to_json())
+        os.replace(tmp_path, token_file)
+    except BaseException:
+        Path(tmp_path).unlink(missing_ok=True)
+        raise
+
+
 def get_service(token_file: Path):
     """Build Gmail API service.
 
@@ -96,8 +180,29 @@ def get_service(token_file: Path):
     Returns:
         Gmail API service instance
     """
-    creds = authenticate(token_file)
-    return build("gmail", "v1", credentials=creds)
+    return _cached_service(token_file)[0]
+
+
+def get_credentials(token_file: Path) -> Credentials:
+    """Get the credentials behind the Gmail service for a token file.
+
+    Args:
+        token_file: Path to the token file
+
+    Returns:
+        Credentials used by get_service for the same token file
+    """
+    return _cached_service(token_file)[1]
+
+
+def _cached_service(token_file: Path) -> tuple[object, Credentials]:
+    """Build or reuse the (service, credentials) pair for a token file."""
+    key = token_file.resolve()
+    cached = _SERVICE_CACHE.get(key)
+    if cached is None:
+        creds = authenticate(token_file)
+        cached = _SERVICE_CACHE[key] = (build("gmail", "v1", credentials=creds), creds)
+    return cached
 
 
 def search_messages(service, query: str, max_results: int = 100) -> list[str]:
@@ -137,22 +242,100 @@ def search_messages(service, query: str, max_results: int = 100) -> list[str]:
     return message_ids[:max_results]
 
 
-def get_message(service, message_id: str) -> dict:
-    """Get a full message by ID.
+def _message_request(
+    service,
+    message_id: str,
+    format: str,
+    metadata_headers: list[str] | None,
+):
+    """Build a messages.get request."""
+    kwargs = {}
+    if format == "metadata":
+        kwargs["metadataHeaders"] = metadata_headers or METADATA_HEADERS
+    return service.users().messages().get(userId="me", id=message_id, format=format, **kwargs)
+
+
+def get_message(
+    service,
+    message_id: str,
+    format: str = "full",
+    metadata_headers: list[str] | None = None,
+    num_retries: int = 0,
+) -> dict:
+    """Get a message by ID.
 
     Args:
         service: Gmail API service
         message_id: Message ID
+        format: "full" for the whole message, or "metadata" for headers and
+            snippet only
+        metadata_headers: Headers to return in metadata format (defaults to
+            METADATA_HEADERS)
+        num_retries: Times to retry with backoff on rate limit or server errors
 
     Returns:
-        Full message resource
+        Message resource
     """
-    return (
-        service.users()
-        .messages()
-        .get(userId="me", id=message_id, format="full")
-        .execute()
-    )
+    request = _message_request(service, message_id, format, metadata_headers)
+    return request.execute(num_retries=num_retries)
+
+
+def get_messages(
+    service,
+    message_ids: list[str],
+    format: str = "full",
+    metadata_headers: list[str] | None = None,
+) -> list[dict | Exception]:
+    """Get several messages using batched requests.
+
+    Messages whose batched call was rate limited or failed with a server
+    error are fetched again one at a time, with backoff. Any other failure
+    (e.g. a message deleted since it was listed) is returned in place of
+    that message rather than aborting the rest.
+
+    Args:
+        service: Gmail API service
+        message_ids: Message IDs to fetch
+        format: "full" or "metadata", as for get_message
+        metadata_headers: Headers to return in metadata format
+
+    Returns:
+        Message resources, in the same order as message_ids, or the
+        exception raised while fetching each one
+    """
+    messages: dict[str, dict | Exception] = {}
+    retry: list[str] = []
+
+    def callback(request_id: str, response: dict, exception: Exception | None) -> None:
+        if exception is None:
+            messages[request_id] = response
+        elif isinstance(exception, HttpError) and (
+            exception.resp.status == 429 or exception.resp.status >= 500
+        ):
+            retry.append(request_id)
+        else:
+            messages[request_id] = exception
+
+    unique = list(dict.fromkeys(message_ids))
+    for start in range(0, len(unique), MESSAGE_BATCH_SIZE):
+        batch = service.new_batch_http_request(callback=callback)
+        for message_id in unique[start:start + MESSAGE_BATCH_SIZE]:
+            batch.add(
+                _message_request(service, message_id, format, metadata_headers),
+                request_id=message_id,
+            )
+        batch.execute()
+
+    # Fall back to individual requests for anything the batch endpoint dropped
+    for message_id in retry:
+        try:
+            messages[message_id] = get_message(
+                service, message_id, format, metadata_headers, num_retries=MESSAGE_RETRIES
+            )
+        except HttpError as e:
+            messages[message_id] = e
+
+    return [messages[message_id] for message_id in message_ids]
 
 
 def get_email_metadata(message: dict) -> EmailMetadata:
@@ -164,7 +347,16 @@ def get_email_metadata(message: dict) -> EmailMetadata:
     Returns:
         EmailMetadata with subject, sender, date, snippet
     """
-    headers = {h["name"].lower(): h["value"] for h in message["payload"]["headers"]}
+    # Scan headers only until the few we need have all been seen
+    headers: dict[str, str] = {}
+    needed = set(_METADATA_HEADER_KEYS)
+    for header in message["payload"]["headers"]:
+        name = header["name"].lower()
+        if name in needed:
+            headers[name] = header["value"]
+            needed.discard(name)
+            if not needed:
+                break
 
     return EmailMetadata(
         message_id=message["id"],
@@ -175,6 +367,15 @@ def get_email_metadata(message: dict) -> EmailMetadata:
     )
 
 
+def _walk_parts(payload: dict) -> Iterator[dict]:
+    """Yield a payload and all of its nested MIME parts in document order."""
+    stack = deque([payload])
+    while stack:
+        part = stack.pop()
+        yield part
+        stack.extend(reversed(part.get("parts", ())))
+
+
 def get_attachments(message: dict) -> list[Attachment]:
     """Get list of attachments from a message.
 
@@ -184,64 +385,151 @@ def get_attachments(message: dict) -> list[Attachment]:
     Returns:
         List of Attachment objects
     """
-    attachments = []
-
-    def process_parts(parts: list[dict]) -> None:
-        for part in parts:
-            # Recursively process nested parts
-            if "parts" in part:
-                process_parts(part["parts"])
-
-            # Check for attachment
-            filename = part.get("filename", "")
-            if filename and part.get("body", {}).get("attachmentId"):
-                attachments.append(
-                    Attachment(
-                        attachment_id=part["body"]["attachmentId"],
-                        filename=filename,
-                        mime_type=part.get("mimeType", "application/octet-stream"),
-                        size=part.get("body", {}).get("size", 0),
-                    )
-                )
-
-    payload = message.get("payload", {})
-    if "parts" in payload:
-        process_parts(payload["parts"])
-    elif payload.get("filename") and payload.get("body", {}).get("attachmentId"):
-        # Single-part message with attachment
-        attachments.append(
-            Attachment(
-                attachment_id=payload["body"]["attachmentId"],
-                filename=payload["filename"],
-                mime_type=payload.get("mimeType", "application/octet-stream"),
-                size=payload.get("body", {}).get("size", 0),
-            )
+    return [
+        Attachment(
+            attachment_id=part["body"]["attachmentId"],
+            filename=part["filename"],
+            mime_type=part.get("mimeType", "application/octet-stream"),
+            size=part["body"].get("size", 0),
         )
+        for part in _walk_parts(message.get("payload", {}))
+        if part.get("filename") and part.get("body", {}).get("attachmentId")
+    ]
 
-    return attachments
 
+def download_attachment_to(
+    service,
+    message_id: str,
+    attachment_id: str,
+    fp: BinaryIO,
+    http=None,
+) -> int:
+    """Download attachment data, decoding it straight into a file.
 
-def download_attachment(service, message_id: str, attachment_id: str) -> bytes:
-    """Download attachment data.
+    The base64url payload is decoded in fixed-size chunks so the decoded
+    bytes never have to be held in memory all at once.
 
     Args:
         service: Gmail API service
         message_id: Message ID
         attachment_id: Attachment ID
+        fp: Binary file object to write to
+        http: Optional httplib2.Http to send the request with
 
     Returns:
-        Raw attachment data
+        Number of bytes written
     """
     attachment = (
         service.users()
         .messages()
         .attachments()
         .get(userId="me", messageId=message_id, id=attachment_id)
-        .execute()
+        .execute(http=http, num_retries=DOWNLOAD_RETRIES)
     )
 
     data = attachment.get("data", "")
-    return base64.urlsafe_b64decode(data)
+    written = 0
+    for start in range(0, len(data), DECODE_CHUNK_SIZE):
+        chunk = data[start:start + DECODE_CHUNK_SIZE]
+        # Only the final chunk can be short; restore any stripped padding
+        chunk += "=" * (-len(chunk) % 4)
+        written += fp.write(_urlsafe_b64decode(chunk))
+    return written
+
+
+def download_attachment_to_path(
+    service,
+    message_id: str,
+    attachment_id: str,
+    path: Path,
+    size: int = 0,
+    fsync: bool = False,
+    http=None,
+) -> int:
+    """Download an attachment straight to a file path.
+
+    The partially written file is removed if the download fails.
+
+    Args:
+        service: Gmail API service
+        message_id: Message ID
+        attachment_id: Attachment ID
+        path: Destination file path
+        size: Expected size in bytes as reported by Gmail; used to reserve
+            the file's extent up front
+        fsync: If True, flush the file to disk before returning
+        http: Optional httplib2.Http to send the request with
+
+    Returns:
+        Number of bytes written
+    """
+    try:
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        with open(fd, "wb") as fp:
+            # Reserve the full extent up front to avoid fragmented growth
+            if size > 0 and hasattr(os, "posix_fallocate"):
+                try:
+                    os.posix_fallocate(fd, 0, size)
+                except OSError:
+                    pass  # Not supported by this filesystem
+            written = download_attachment_to(service, message_id, attachment_id, fp, http=http)
+            # Drop any reserved space beyond the actual data
+            fp.truncate()
+            if fsync:
+                fp.flush()
+                os.fsync(fd)
+            return written
+    except BaseException:
+        path.unlink(missing_ok=True)
+        raise
+
+
+def download_attachments_bulk(
+    service,
+    credentials: Credentials,
+    jobs: list[tuple[str, str, Path, int]],
+    max_workers: int = DOWNLOAD_WORKERS,
+    fsync: bool = False,
+) -> dict[Path, int | Exception]:
+    """Download several attachments to disk concurrently.
+
+    httplib2 connections are not thread-safe, so each worker thread sends its
+    requests over its own authorized Http built from the service credentials.
+
+    Args:
+        service: Gmail API service
+        credentials: Credentials the service was built with (see get_credentials)
+        jobs: List of (message_id, attachment_id, destination path, expected size)
+        max_workers: Maximum number of concurrent downloads
+        fsync: If True, flush each file to disk once it is written
+
+    Returns:
+        Dict mapping each destination path to the number of bytes written,
+        or to the exception raised while downloading it
+    """
+    local = threading.local()
+
+    def download(job: tuple[str, str, Path, int]) -> int:
+        if not hasattr(local, "http"):
+            # build_http applies the same socket timeout as the service's own Http
+            local.http = AuthorizedHttp(credentials, http=build_http())
+        message_id, attachment_id, path, size = job
+        return download_attachment_to_path(
+            service, message_id, attachment_id, path, size=size, fsync=fsync, http=local.http
+        )
+
+    # Never write the same file from two threads; the last job for a path wins
+    jobs = list({job[2]: job for job in jobs}.values())
+
+    results: dict[Path, int | Exception] = {}
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(jobs)))) as executor:
+        futures = {job[2]: executor.submit(download, job) for job in jobs}
+        for path, future in futures.items():
+            try:
+                results[path] = future.result()
+            except Exception as e:
+                results[path] = e
+    return results
 
 
 def get_body_text(message: dict) -> str:
@@ -253,36 +541,11 @@ def get_body_text(message: dict) -> str:
     Returns:
         Plain text body content
     """
-
-    def find_text_part(parts: list[dict]) -> str | None:
-        for part in parts:
-            # Recursively search nested parts
-            if "parts" in part:
-                text = find_text_part(part["parts"])
-                if text:
-                    return text
-
-            # Look for text/plain
-            if part.get("mimeType") == "text/plain":
-                data = part.get("body", {}).get("data", "")
-                if data:
-                    return base64.urlsafe_b64decode(data).decode("utf-8", errors="ignore")
-
-        return None
-
-    payload = message.get("payload", {})
-
-    # Single-part message
-    if payload.get("mimeType") == "text/plain":
-        data = payload.get("body", {}).get("data", "")
-        if data:
-            return base64.urlsafe_b64decode(data).decode("utf-8", errors="ignore")
-
-    # Multi-part message
-    if "parts" in payload:
-        text = find_text_part(payload["parts"])
-        if text:
-            return text
+    for part in _walk_parts(message.get("payload", {})):
+        if part.get("mimeType") == "text/plain":
+            data = part.get("body", {}).get("data", "")
+            if data:
+                return _urlsafe_b64decode(data).decode("utf-8", errors="ignore")
 
     # Fallback to snippet
     return message.get("snippet", "")
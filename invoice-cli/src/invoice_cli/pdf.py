@@ -4,6 +4,13 @@ from pathlib import Path
 
 import pdfplumber
 
+# Optional PDFium-based extractor, much faster than pdfplumber
+try:
+    import pypdfium2 as pdfium
+    HAS_PDFIUM = True
+except ImportError:
+    HAS_PDFIUM = False
+
 
 def extract_text_from_pdf(pdf_path: Path) -> str:
     """Extract all text from a PDF file.
@@ -21,6 +28,9 @@ def extract_text_from_pdf(pdf_path: Path) -> str:
     if not pdf_path.exists():
         raise FileNotFoundError(f"PDF file not found: {pdf_path}")
 
+    if HAS_PDFIUM:
+        return _extract_text_pdfium(pdf_path)
+
     text_parts = []
 
     with pdfplumber.open(pdf_path) as pdf:
@@ -28,6 +38,25 @@ def extract_text_from_pdf(pdf_path: Path) -> str:
             page_text = page.extract_text()
             if page_text:
                 text_parts.append(page_text)
+            # Drop the page's parsed layout objects before moving on
+            page.close()
+
+    return "\n\n".join(text_parts)
+
+
+def _extract_text_pdfium(pdf_path: Path) -> str:
+    """Extract all text from a PDF file using PDFium."""
+    text_parts = []
+
+    pdf = pdfium.PdfDocument(str(pdf_path))
+    try:
+        for page in pdf:
+            page_text = page.get_textpage().get_text_range()
+            if page_text.strip():
+                # PDFium separates lines with CRLF
+                text_parts.append(page_text.replace("\r\n", "\n"))
+    finally:
+        pdf.close()
 
     return "\n\n".join(text_parts)
 
@@ -1,10 +1,36 @@
 """Storage management for invoice records and attachments."""
 
 import json
+import os
+import sqlite3
+from collections.abc import Iterable
 from datetime import datetime
 from pathlib import Path
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, TypeAdapter
+
+# Optional fast JSON encoder/decoder for record and index files
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+
+def _dump_json(obj, indent: bool = True) -> bytes:
+    """Serialize to JSON bytes, indented unless indent is False."""
+    if HAS_ORJSON:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else None)
+    if indent:
+        return json.dumps(obj, indent=2).encode()
+    return json.dumps(obj, separators=(",", ":")).encode()
+
+
+def _load_json(data: bytes):
+    """Parse JSON bytes."""
+    if HAS_ORJSON:
+        return orjson.loads(data)
+    return json.loads(data)
 
 
 class InvoiceRecord(BaseModel):
@@ -66,6 +92,47 @@ class InvoiceRecord(BaseModel):
     gdrive_folder_path: str | None = None
 
 
+# Validates a whole JSON array of records in one pydantic-core pass
+_RECORD_LIST_ADAPTER = TypeAdapter(list[InvoiceRecord])
+
+# Upsert of one (message_id, processed_at, is_invoice, blob) index row
+_UPSERT_SQL = (
+    "INSERT INTO records (message_id, processed_at, is_invoice, blob)"
+    " VALUES (?, ?, ?, ?)"
+    " ON CONFLICT (message_id) DO UPDATE SET"
+    " processed_at = excluded.processed_at,"
+    " is_invoice = excluded.is_invoice,"
+    " blob = excluded.blob"
+)
+
+
+def scan_attachments(paths: Iterable[str]) -> dict[str, os.DirEntry]:
+    """Look up attachment files with one directory scan per parent folder.
+
+    Args:
+        paths: Attachment file paths, as stored on InvoiceRecord
+
+    Returns:
+        Mapping of path to DirEntry for each path that exists as a file
+    """
+    by_dir: dict[str, list[str]] = {}
+    for path in paths:
+        by_dir.setdefault(os.path.dirname(path), []).append(path)
+
+    found: dict[str, os.DirEntry] = {}
+    for directory, dir_paths in by_dir.items():
+        try:
+            with os.scandir(directory or ".") as it:
+                entries = {e.name: e for e in it}
+        except (FileNotFoundError, NotADirectoryError):
+            continue
+        for path in dir_paths:
+            entry = entries.get(os.path.basename(path))
+            if entry is not None and entry.is_file():
+                found[path] = entry
+    return found
+
+
 class InvoiceStorage:
     """Manages storage of invoice records and attachments."""
 
@@ -79,12 +146,19 @@ class InvoiceStorage:
         self.attachments_dir = base_path / "attachments"
         self.metadata_dir = base_path / "metadata"
         self.emails_dir = self.metadata_dir / "emails"
-        self.index_path = self.metadata_dir / "index.json"
+        self.db_path = self.metadata_dir / "records.sqlite"
 
         # Ensure directories exist
         self.attachments_dir.mkdir(parents=True, exist_ok=True)
         self.emails_dir.mkdir(parents=True, exist_ok=True)
 
+        # Message IDs with a record file, refreshed when emails_dir changes
+        self._message_ids: set[str] | None = None
+        self._emails_mtime = 0
+
+        # Index database connection, opened on first use
+        self._conn: sqlite3.Connection | None = None
+
     def has_message(self, message_id: str) -> bool:
         """Check if a message has already been processed.
 
@@ -94,7 +168,14 @@ class InvoiceStorage:
         Returns:
             True if already processed
         """
-        return (self.emails_dir / f"{message_id}.json").exists()
+        mtime = os.stat(self.emails_dir).st_mtime_ns
+        if self._message_ids is None or mtime != self._emails_mtime:
+            with os.scandir(self.emails_dir) as it:
+                self._message_ids = {
+                    entry.name[:-5] for entry in it if entry.name.endswith(".json")
+                }
+            self._emails_mtime = mtime
+        return message_id in self._message_ids
 
     def save_record(self, record: InvoiceRecord) -> None:
         """Save an invoice record.
@@ -102,67 +183,186 @@ class InvoiceStorage:
         Args:
             record: InvoiceRecord to save
         """
-        record_path = self.emails_dir / f"{record.message_id}.json"
-        with open(record_path, "w") as f:
-            json.dump(record.model_dump(), f, indent=2)
+        self._write_record(record)
 
         # Update index
-        self._update_index()
+        self._update_index([record])
 
-    def save_attachment(
-        self,
-        message_id: str,
-        filename: str,
-        data: bytes,
-    ) -> Path:
-        """Save an attachment file.
+    def save_records(self, records: Iterable[InvoiceRecord]) -> int:
+        """Save several invoice records, rewriting the index once.
+
+        Args:
+            records: InvoiceRecords to save
+
+        Returns:
+            Number of records saved
+        """
+        saved = []
+        for record in records:
+            self._write_record(record)
+            saved.append(record)
+
+        if saved:
+            self._update_index(saved)
+        return len(saved)
+
+    def _write_record(self, record: InvoiceRecord) -> None:
+        """Write a single record file without touching the index."""
+        record_path = self.emails_dir / f"{record.message_id}.json"
+        record_path.write_bytes(record.model_dump_json(indent=2).encode())
+        if self._message_ids is not None:
+            self._message_ids.add(record.message_id)
+
+    def attachment_path(self, message_id: str, filename: str) -> Path:
+        """Get the path an attachment is stored at, creating its directory.
 
         Args:
             message_id: Gmail message ID
             filename: Original filename
-            data: Raw file data
 
         Returns:
-            Path to saved file
+            Path to the attachment file
         """
         # Create message-specific directory
-        msg_dir = self.attachments_dir / message_id
-        msg_dir.mkdir(exist_ok=True)
+        msg_dir = self._msg_dir(message_id)
+        msg_dir.mkdir(parents=True, exist_ok=True)
+        return msg_dir / filename
 
-        # Save attachment
-        file_path = msg_dir / filename
-        with open(file_path, "wb") as f:
-            f.write(data)
+    def _msg_dir(self, message_id: str) -> Path:
+        """Get a message's attachment directory, sharded by ID prefix."""
+        return self.attachments_dir / message_id[:2] / message_id
 
-        return file_path
+    def _db(self) -> sqlite3.Connection:
+        """Get the index database connection, creating the schema if needed.
 
-    def _update_index(self) -> None:
-        """Update the master index file."""
-        records = []
+        A new database is created and populated from the per-email record
+        files in a single transaction, so an interrupted migration leaves no
+        half-filled table behind.
+        """
+        if self._conn is not None:
+            return self._conn
+
+        conn = sqlite3.connect(self.db_path, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            exists = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'records'"
+            ).fetchone()
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS records ("
+                " message_id TEXT PRIMARY KEY,"
+                " processed_at TEXT,"
+                " is_invoice INTEGER,"
+                " blob BLOB)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS records_processed_at ON records (processed_at)"
+            )
+            if not exists:
+                rows, _ = self._read_record_files()
+                conn.executemany(_UPSERT_SQL, rows)
+        except BaseException:
+            conn.execute("ROLLBACK")
+            conn.close()
+            raise
+        conn.execute("COMMIT")
+
+        self._conn = conn
+        return conn
+
+    def _update_index(self, records: list[InvoiceRecord]) -> None:
+        """Upsert just-saved records into the index database.
 
-        for record_file in self.emails_dir.glob("*.json"):
-            with open(record_file) as f:
-                records.append(json.load(f))
+        Args:
+            records: Records that were just written
+        """
+        self._upsert_rows(
+            (
+                r.message_id,
+                r.processed_at,
+                r.is_invoice,
+                r.model_dump_json().encode(),
+            )
+            for r in records
+        )
+
+    def _read_record_files(self) -> tuple[list[tuple[str, str, bool, bytes]], list[Path]]:
+        """Read index rows from all record files.
 
-        # Sort by processed_at descending
-        records.sort(key=lambda r: r.get("processed_at", ""), reverse=True)
+        Returns:
+            Tuple of (rows, paths of unreadable record files that were skipped)
+        """
+        rows = []
+        skipped = []
+
+        with os.scandir(self.emails_dir) as it:
+            for entry in it:
+                if not entry.name.endswith(".json") or not entry.is_file():
+                    continue
+                try:
+                    with open(entry.path, "rb") as f:
+                        data = _load_json(f.read())
+                    rows.append((
+                        str(data["message_id"]),
+                        data.get("processed_at", ""),
+                        bool(data.get("is_invoice")),
+                        _dump_json(data, indent=False),
+                    ))
+                except (OSError, ValueError, KeyError, TypeError):
+                    skipped.append(Path(entry.path))
+
+        return rows, skipped
+
+    def rebuild_index(self) -> tuple[int, list[Path]]:
+        """Rebuild the index database from all record files.
 
-        with open(self.index_path, "w") as f:
-            json.dump(records, f, indent=2)
+        Returns:
+            Tuple of (records indexed, paths of unreadable record files skipped)
+        """
+        rows, skipped = self._read_record_files()
+
+        conn = self._db()
+        conn.execute("BEGIN")
+        try:
+            conn.execute("DELETE FROM records")
+            conn.executemany(_UPSERT_SQL, rows)
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+        return len(rows), skipped
+
+    def _upsert_rows(self, rows: Iterable[tuple[str, str, bool, bytes]]) -> None:
+        """Insert or replace (message_id, processed_at, is_invoice, blob) rows."""
+        conn = self._db()
+        conn.execute("BEGIN")
+        try:
+            conn.executemany(_UPSERT_SQL, rows)
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def load_index(self, invoices_only: bool = False) -> list[InvoiceRecord]:
+        """Load all records from the index, newest first.
 
-    def load_index(self) -> list[InvoiceRecord]:
-        """Load all records from the index.
+        Args:
+            invoices_only: Only load records classified as invoices
 
         Returns:
             List of InvoiceRecord objects
         """
-        if not self.index_path.exists():
-            return []
+        query = "SELECT blob FROM records"
+        if invoices_only:
+            query += " WHERE is_invoice"
+        query += " ORDER BY processed_at DESC"
 
-        with open(self.index_path) as f:
-            data = json.load(f)
-
-        return [InvoiceRecord.model_validate(r) for r in data]
+        # Splice the stored JSON blobs into one array and validate it at once
+        blobs = [blob for (blob,) in self._db().execute(query)]
+        return _RECORD_LIST_ADAPTER.validate_json(b"[" + b",".join(blobs) + b"]")
 
     def load_record(self, message_id: str) -> InvoiceRecord | None:
         """Load a specific record.
@@ -177,8 +377,7 @@ class InvoiceStorage:
         if not record_path.exists():
             return None
 
-        with open(record_path) as f:
-            return InvoiceRecord.model_validate(json.load(f))
+        return InvoiceRecord.model_validate_json(record_path.read_bytes())
 
     def get_attachments_for_message(self, message_id: str) -> list[Path]:
         """Get list of attachment files for a message.
@@ -189,7 +388,53 @@ class InvoiceStorage:
         Returns:
             List of paths to attachment files
         """
-        msg_dir = self.attachments_dir / message_id
-        if not msg_dir.exists():
-            return []
-        return list(msg_dir.iterdir())
+        # Stores not yet rebalanced keep a flat layout
+        for msg_dir in (self._msg_dir(message_id), self.attachments_dir / message_id):
+            try:
+                with os.scandir(msg_dir) as it:
+                    return [msg_dir / entry.name for entry in it]
+            except FileNotFoundError:
+                continue
+        return []
+
+    def rebalance(self) -> tuple[int, int]:
+        """Move message directories from the flat layout into ID-prefix shards.
+
+        Attachment paths stored on records are then rewritten to match. The
+        rewrite covers every record still pointing at a flat path whose
+        sharded copy exists, so rerunning repairs an interrupted rebalance.
+
+        Returns:
+            Tuple of (message directories moved, records updated)
+        """
+        moved = 0
+        with os.scandir(self.attachments_dir) as it:
+            legacy = [e.name for e in it if len(e.name) > 2 and e.is_dir()]
+
+        for message_id in legacy:
+            old_dir = self.attachments_dir / message_id
+            new_dir = self._msg_dir(message_id)
+            if new_dir.exists():
+                continue
+            new_dir.parent.mkdir(exist_ok=True)
+            os.rename(old_dir, new_dir)
+            moved += 1
+
+        # Point records at the new locations
+        flat_root = str(self.attachments_dir)
+        updated = []
+        for record in self.load_index():
+            attachments = []
+            for path in record.attachments:
+                msg_dir = os.path.dirname(path)
+                if os.path.dirname(msg_dir) == flat_root and not os.path.exists(path):
+                    sharded = self._msg_dir(os.path.basename(msg_dir)) / os.path.basename(path)
+                    if sharded.exists():
+                        path = str(sharded)
+                attachments.append(path)
+            if attachments != record.attachments:
+                record.attachments = attachments
+                updated.append(record)
+        self.save_records(updated)
+
+        return moved, len(updated)
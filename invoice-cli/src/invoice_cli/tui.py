@@ -1,6 +1,9 @@
 """Interactive TUI for managing invoice ownership."""
 
+import os
 import subprocess
+from collections import Counter
+from collections.abc import Iterable
 from pathlib import Path
 
 from textual.app import App, ComposeResult
@@ -8,9 +11,51 @@ from textual.binding import Binding
 from textual.widgets import DataTable, Footer, Header, Input, Static, ListView, ListItem, Label
 from textual.containers import Vertical, VerticalScroll
 from textual.screen import Screen
+from textual.timer import Timer
 
 from invoice_cli.config import load_config, save_config
-from invoice_cli.storage import InvoiceRecord, InvoiceStorage
+from invoice_cli.storage import InvoiceRecord, InvoiceStorage, scan_attachments
+
+
+# Delay after the last keystroke before the filter is applied
+FILTER_DEBOUNCE_SECONDS = 0.08
+
+# Address fields shown in the detail view, in display order
+_ADDRESS_KEYS = ("street", "postal_code", "city", "country")
+
+
+def _ownership_cell(ownership: str | None) -> str:
+    """Format the ownership indicator shown in the invoice table."""
+    if ownership == "personal":
+        return "[green]P[/green]"
+    if ownership == "work":
+        return "[yellow]W[/yellow]"
+    return "-"
+
+
+def _row_cells(record: InvoiceRecord) -> tuple[str, ...]:
+    """Format a record's cells for the invoice table."""
+    # Date
+    date_str = record.invoice_date or (record.date[:10] if record.date else "")
+
+    # Company
+    company = record.company_name or record.sender.partition("<")[0].strip()
+
+    # Amount
+    if record.amount is not None:
+        currency = record.currency or ""
+        amount_str = f"{record.amount:,.2f} {currency}"
+    else:
+        amount_str = "-"
+
+    return (
+        _ownership_cell(record.ownership),
+        date_str[:12],
+        company[:24],
+        amount_str,
+        record.subject[:39],
+        record.message_id[:12],
+    )
 
 
 class DetailScreen(Screen):
@@ -23,11 +68,17 @@ class DetailScreen(Screen):
         Binding("u", "mark_unset", "Unset", show=True),
     ]
 
-    def __init__(self, record: InvoiceRecord, storage: InvoiceStorage, all_records: list[InvoiceRecord]) -> None:
+    def __init__(self, record: InvoiceRecord, storage: InvoiceStorage) -> None:
         super().__init__()
         self.record = record
         self.storage = storage
-        self.all_records = all_records
+
+        # Stat attachments once for the screen's lifetime: (path, size or None if missing)
+        entries = scan_attachments(record.attachments)
+        self._att_info = [
+            (att, entries[att].stat().st_size if att in entries else None)
+            for att in record.attachments
+        ]
 
     def compose(self) -> ComposeResult:
         yield Header()
@@ -42,14 +93,13 @@ class DetailScreen(Screen):
     def _build_attachment_items(self) -> list[ListItem]:
         """Build list items for attachments."""
         items = []
-        for att in self.record.attachments:
-            path = Path(att)
-            if path.exists():
-                size = path.stat().st_size
+        for att, size in self._att_info:
+            name = os.path.basename(att)
+            if size is not None:
                 size_str = f"{size / 1024:.1f} KB" if size < 1024 * 1024 else f"{size / 1024 / 1024:.1f} MB"
-                label = f"  [green]{path.name}[/green] ({size_str})"
+                label = f"  [green]{name}[/green] ({size_str})"
             else:
-                label = f"  [red]{path.name}[/red] (missing)"
+                label = f"  [red]{name}[/red] (missing)"
             item = ListItem(Label(label), id=f"att-{len(items)}")
             item.attachment_path = att  # Store path on the item
             items.append(item)
@@ -77,7 +127,7 @@ class DetailScreen(Screen):
     def _build_detail_text(self) -> str:
         """Build the detail text for the invoice."""
         r = self.record
-        lines = []
+        lines: list[str] = []
 
         # Header
         lines.append(f"[bold cyan]Invoice Details[/bold cyan]\n")
@@ -131,7 +181,7 @@ class DetailScreen(Screen):
                     lines.append(f"  VAT ID: {r.seller_vat_id}")
                 if r.seller_address:
                     addr = r.seller_address
-                    addr_parts = [addr.get(k) for k in ["street", "postal_code", "city", "country"] if addr.get(k)]
+                    addr_parts = [addr[k] for k in _ADDRESS_KEYS if addr.get(k)]
                     if addr_parts:
                         lines.append(f"  Address: {', '.join(addr_parts)}")
 
@@ -144,7 +194,7 @@ class DetailScreen(Screen):
                     lines.append(f"  VAT ID: {r.buyer_vat_id}")
                 if r.buyer_address:
                     addr = r.buyer_address
-                    addr_parts = [addr.get(k) for k in ["street", "postal_code", "city", "country"] if addr.get(k)]
+                    addr_parts = [addr[k] for k in _ADDRESS_KEYS if addr.get(k)]
                     if addr_parts:
                         lines.append(f"  Address: {', '.join(addr_parts)}")
 
@@ -185,26 +235,13 @@ class DetailScreen(Screen):
     def _update_ownership(self, ownership: str | None) -> None:
         """Update ownership for this record and all matching company records."""
         company_name = self.record.company_name
-        updated_count = 0
-
-        # Update all records with the same company name
-        if company_name:
-            for r in self.all_records:
-                if r.company_name and r.company_name.lower() == company_name.lower():
-                    if r.ownership != ownership:
-                        r.ownership = ownership
-                        self.storage.save_record(r)
-                        updated_count += 1
-        else:
-            # No company name, just update this one
-            if self.record.ownership != ownership:
-                self.record.ownership = ownership
-                self.storage.save_record(self.record)
-                updated_count = 1
+        main_screen = self.app.main_screen
+        updated = main_screen.propagate_ownership(self.record, ownership)
+        updated_count = len(updated)
 
         self.query_one("#detail-content", Static).update(self._build_detail_text())
-        self.app.main_screen.ownership_changed = True
-        self.app.main_screen.changes_made += updated_count
+        main_screen.dirty_ids.update(r.message_id for r in updated)
+        main_screen.changes_made += updated_count
 
         if updated_count > 1:
             self.notify(f"Updated {updated_count} invoices from '{company_name}'", severity="information")
@@ -243,10 +280,18 @@ class MainScreen(Screen):
         self.config = load_config()
         self.storage = InvoiceStorage(self.config.storage.base_path)
         self.all_records: list[InvoiceRecord] = []
+        self._by_company_lower: dict[str, list[InvoiceRecord]] = {}
         self.filtered_records: list[InvoiceRecord] = []
         self.filter_text = ""
+        self._applied_filter = ""
+        self._filter_timer: Timer | None = None
+        self._search_blobs: dict[str, str] = {}
+        self._ownership_counts: Counter[str] = Counter()
+        self._rows: dict[str, tuple[str, ...]] = {}
         self.changes_made = 0
-        self.ownership_changed = False
+
+        # Records changed from the detail screen whose table cells need patching
+        self.dirty_ids: set[str] = set()
 
     def compose(self) -> ComposeResult:
         yield Header()
@@ -263,30 +308,83 @@ class MainScreen(Screen):
 
     def on_screen_resume(self) -> None:
         """Called when returning to this screen."""
-        if self.ownership_changed:
-            # Reload records to get updated data
-            self.load_records()
-            self.apply_filter()
-            self.ownership_changed = False
+        # Records are shared with the detail screen and already updated in
+        # place, so only the changed rows need repainting
+        if self.dirty_ids:
+            self._patch_ownership_cells(self.dirty_ids)
+            self.dirty_ids.clear()
+            self.update_status()
 
     def load_records(self) -> None:
         """Load invoice records."""
-        records = self.storage.load_index()
-        self.all_records = [r for r in records if r.is_invoice]
+        self.all_records = self.storage.load_index(invoices_only=True)
         self.filtered_records = self.all_records.copy()
 
+        # Index by company so ownership changes can propagate with one lookup
+        self._by_company_lower = {}
+        for r in self.all_records:
+            if r.company_name:
+                self._by_company_lower.setdefault(r.company_name.lower(), []).append(r)
+
+        # Lowercased searchable fields, joined once so filtering is one find per record
+        self._search_blobs = {
+            r.message_id: "\0".join((r.company_name or "", r.subject, r.message_id, r.sender)).lower()
+            for r in self.all_records
+        }
+        self._applied_filter = ""
+
+        # Ownership tallies for the status bar, kept current by set_record_ownership
+        self._ownership_counts = Counter(r.ownership or "unset" for r in self.all_records)
+
+        # Table cells depend only on the record, so format them once
+        self._rows = {r.message_id: _row_cells(r) for r in self.all_records}
+
+    def records_for_company(self, company_name: str) -> list[InvoiceRecord]:
+        """Get all loaded records with this company name (case-insensitive)."""
+        return self._by_company_lower.get(company_name.lower(), [])
+
+    def propagate_ownership(self, record: InvoiceRecord, ownership: str | None) -> list[InvoiceRecord]:
+        """Set ownership on a record and every record from the same company.
+
+        Changed records are saved together in one batch.
+
+        Returns:
+            Records whose ownership changed
+        """
+        # Records without a company name are updated on their own
+        targets = self.records_for_company(record.company_name) if record.company_name else [record]
+        updated = [r for r in targets if self.set_record_ownership(r, ownership)]
+        self.storage.save_records(updated)
+        return updated
+
+    def set_record_ownership(self, record: InvoiceRecord, ownership: str | None) -> bool:
+        """Change a record's ownership in memory, keeping the status counts current.
+
+        Returns:
+            True if the ownership changed
+        """
+        if record.ownership == ownership:
+            return False
+        self._ownership_counts[record.ownership or "unset"] -= 1
+        self._ownership_counts[ownership or "unset"] += 1
+        record.ownership = ownership
+        row = self._rows.get(record.message_id)
+        if row is not None:
+            self._rows[record.message_id] = (_ownership_cell(ownership), *row[1:])
+        return True
+
     def setup_table(self) -> None:
         """Set up the data table."""
         table = self.query_one("#invoice-table", DataTable)
         table.cursor_type = "row"
         table.zebra_stripes = True
 
-        table.add_column("Own", width=5)
-        table.add_column("Date", width=12)
-        table.add_column("Company", width=25)
-        table.add_column("Amount", width=15)
-        table.add_column("Subject", width=40)
-        table.add_column("ID", width=14)
+        table.add_column("Own", key="own", width=5)
+        table.add_column("Date", key="date", width=12)
+        table.add_column("Company", key="company", width=25)
+        table.add_column("Amount", key="amount", width=15)
+        table.add_column("Subject", key="subject", width=40)
+        table.add_column("ID", key="id", width=14)
 
         self.refresh_table()
 
@@ -299,38 +397,9 @@ class MainScreen(Screen):
 
         table.clear()
 
+        rows = self._rows
         for record in self.filtered_records:
-            # Ownership indicator
-            if record.ownership == "personal":
-                own_str = "[green]P[/green]"
-            elif record.ownership == "work":
-                own_str = "[yellow]W[/yellow]"
-            else:
-                own_str = "-"
-
-            # Date
-            date_str = record.invoice_date or (record.date[:10] if record.date else "")
-
-            # Company
-            company = record.company_name or record.sender.split("<")[0].strip()
-            company = company[:24]
-
-            # Amount
-            if record.amount is not None:
-                currency = record.currency or ""
-                amount_str = f"{record.amount:,.2f} {currency}"
-            else:
-                amount_str = "-"
-
-            table.add_row(
-                own_str,
-                date_str[:12],
-                company,
-                amount_str,
-                record.subject[:39],
-                record.message_id[:12],
-                key=record.message_id,
-            )
+            table.add_row(*rows[record.message_id], key=record.message_id)
 
         # Restore cursor position
         if preserve_cursor and saved_row is not None and len(self.filtered_records) > 0:
@@ -339,24 +408,29 @@ class MainScreen(Screen):
 
     def apply_filter(self) -> None:
         """Apply current filter to records."""
-        if not self.filter_text:
+        filter_lower = self.filter_text.lower()
+        if not filter_lower:
             self.filtered_records = self.all_records.copy()
         else:
-            filter_lower = self.filter_text.lower()
-            self.filtered_records = [
-                r for r in self.all_records
-                if filter_lower in (r.company_name or "").lower()
-                or filter_lower in r.subject.lower()
-                or filter_lower in r.message_id.lower()
-                or filter_lower in r.sender.lower()
-            ]
+            # Extending the previous filter can only narrow its results
+            if self._applied_filter and filter_lower.startswith(self._applied_filter):
+                candidates = self.filtered_records
+            else:
+                candidates = self.all_records
+            blobs = self._search_blobs
+            self.filtered_records = [r for r in candidates if filter_lower in blobs[r.message_id]]
+        self._applied_filter = filter_lower
         self.refresh_table()
         self.update_status()
 
     def on_input_changed(self, event: Input.Changed) -> None:
         """Handle filter input changes."""
         self.filter_text = event.value
-        self.apply_filter()
+
+        # Debounce so a burst of keystrokes triggers a single refresh
+        if self._filter_timer is not None:
+            self._filter_timer.stop()
+        self._filter_timer = self.set_timer(FILTER_DEBOUNCE_SECONDS, self.apply_filter)
 
     def get_selected_record(self) -> InvoiceRecord | None:
         """Get the currently selected record."""
@@ -372,23 +446,9 @@ class MainScreen(Screen):
             return
 
         company_name = record.company_name
-        updated_count = 0
-
-        # Update all records with the same company name
-        if company_name:
-            for r in self.all_records:
-                if r.company_name and r.company_name.lower() == company_name.lower():
-                    if r.ownership != ownership:
-                        r.ownership = ownership
-                        self.storage.save_record(r)
-                        updated_count += 1
-        else:
-            # No company name, just update this one
-            if record.ownership != ownership:
-                record.ownership = ownership
-                self.storage.save_record(record)
-                updated_count = 1
+        updated = self.propagate_ownership(record, ownership)
 
+        updated_count = len(updated)
         self.changes_made += updated_count
 
         # Show notification
@@ -397,10 +457,16 @@ class MainScreen(Screen):
         elif updated_count == 1:
             self.notify(f"Updated 1 invoice", severity="information")
 
-        # Refresh the table, preserving cursor position
-        self.refresh_table(preserve_cursor=True)
+        self._patch_ownership_cells(r.message_id for r in updated)
         self.update_status()
 
+    def _patch_ownership_cells(self, message_ids: Iterable[str]) -> None:
+        """Repaint the ownership cell of each listed record that is currently shown."""
+        table = self.query_one("#invoice-table", DataTable)
+        for message_id in message_ids:
+            if message_id in table.rows:
+                table.update_cell(message_id, "own", self._rows[message_id][0])
+
     def action_mark_personal(self) -> None:
         """Mark selected invoice as personal."""
         self.update_record_ownership("personal")
@@ -417,7 +483,7 @@ class MainScreen(Screen):
         """Handle Enter key on a row - show details."""
         record = self.get_selected_record()
         if record:
-            self.app.push_screen(DetailScreen(record, self.storage, self.all_records))
+            self.app.push_screen(DetailScreen(record, self.storage))
 
     def action_focus_filter(self) -> None:
         """Focus the filter input."""
@@ -428,9 +494,9 @@ class MainScreen(Screen):
         status = self.query_one("#status-bar", Static)
 
         # Count by ownership
-        personal_count = sum(1 for r in self.all_records if r.ownership == "personal")
-        work_count = sum(1 for r in self.all_records if r.ownership == "work")
-        unset_count = sum(1 for r in self.all_records if not r.ownership)
+        personal_count = self._ownership_counts["personal"]
+        work_count = self._ownership_counts["work"]
+        unset_count = self._ownership_counts["unset"]
 
         status.update(
             f"Total: {len(self.all_records)} | "